@@ -0,0 +1,91 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Cold-start benchmark for the hub Lambda.  Each run starts a fresh
+interpreter, the way a new Lambda container does, and times every phase of
+bringing the app up:
+
+    python benchmarks/cold_start.py [--runs 5] [--provision]
+
+Table provisioning is skipped unless --provision is given, which needs
+DynamoDB (dynalite) at DYNALITE_URL.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess  # nosec
+
+from os.path import dirname, join, realpath
+
+SRC = join(dirname(dirname(realpath(__file__))), "src")
+
+
+def child() -> None:
+    import time
+
+    phases = {}
+    start = last = time.perf_counter()
+
+    def phase(name):
+        nonlocal last
+        now = time.perf_counter()
+        phases[name] = (now - last) * 1000
+        last = now
+
+    sys.path.insert(0, SRC)
+    from shared.cfg import CFG
+
+    phase("import shared.cfg")
+    import stripe
+
+    phase("import stripe")
+    import connexion
+
+    phase("import connexion")
+    from hub import app as hub_app
+
+    phase("import hub.app")
+    spec, validated = hub_app.load_spec()
+    phase("load cached spec" if validated else "load yaml spec")
+    hub_app.create_app()
+    phase("create_app")
+    phases["total"] = (last - start) * 1000
+    print(json.dumps(phases))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provision", action="store_true")
+    args = parser.parse_args()
+
+    env = dict(os.environ, HUB_PROVISION_TABLES=str(args.provision))
+    env.setdefault("AWS_ACCESS_KEY_ID", "fake")
+    env.setdefault("AWS_SECRET_ACCESS_KEY", "fake")
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(  # nosec
+            [sys.executable, realpath(__file__), "--child"],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'phase':<20} {'median ms':>10} {'min ms':>10}")
+    for name in runs[0]:
+        timings = [run[name] for run in runs]
+        print(f"{name:<20} {statistics.median(timings):>10.1f} {min(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        child()
+    else:
+        main()
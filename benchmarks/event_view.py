@@ -0,0 +1,65 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Microbenchmark of the chained payload accesses a Stripe handler makes, with
+the event wrapped in hub.vendor.view.EventView and in attrdict.AttrDict:
+
+    python benchmarks/event_view.py [--number 20000] [--fixture stripe_....json]
+"""
+
+import sys
+import json
+import timeit
+import argparse
+
+from os.path import dirname, join, realpath
+
+SRC = join(dirname(dirname(realpath(__file__))), "src")
+FIXTURES = join(SRC, "hub", "tests", "unit", "fixtures")
+DEFAULT_FIXTURE = "stripe_invoice_payment_succeeded_new_event.json"
+
+sys.path.insert(0, SRC)
+
+from attrdict import AttrDict  # noqa: E402
+from hub.vendor.view import EventView  # noqa: E402
+
+
+def handler_accesses(payload) -> None:
+    # The accesses StripeInvoicePaymentSucceeded.create_payload makes
+    invoice = payload.data.object
+    invoice.lines.data[0]["plan"]["product"]
+    payload.id
+    payload.type
+    payload.data.object.customer
+    payload.data.object.subscription
+    payload.data.object.currency
+    payload.data.object.charge
+    payload.data.object.amount_due
+    payload.data.object.created
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+
+    with open(join(FIXTURES, args.fixture)) as f:
+        event = json.load(f)
+
+    print(f"{'wrapper':<10} {'wrap us':>10} {'access us':>10}")
+    for wrapper in (EventView, AttrDict):
+        wrap_s = timeit.timeit(lambda: wrapper(event), number=args.number)
+        payload = wrapper(event)
+        access_s = timeit.timeit(lambda: handler_accesses(payload), number=args.number)
+        print(
+            f"{wrapper.__name__:<10} {wrap_s / args.number * 1e6:>10.2f} "
+            f"{access_s / args.number * 1e6:>10.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
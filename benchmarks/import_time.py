@@ -0,0 +1,91 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Import-time profile of a hub module, from `python -X importtime` in a fresh
+interpreter.  Prints the slowest top-level packages and fails when the total
+goes over the budget, so a new eager import shows up as a regression:
+
+    python benchmarks/import_time.py [--module hub.app] [--budget-ms 1000]
+"""
+
+import os
+import sys
+import argparse
+import subprocess  # nosec
+
+from collections import defaultdict
+from os.path import dirname, join, realpath
+from typing import Dict, List, Tuple
+
+SRC = join(dirname(dirname(realpath(__file__))), "src")
+
+# Total import time of hub.app allowed before the benchmark fails
+IMPORT_BUDGET_MS = 1000
+
+# Dependencies that should only be imported when they are used
+LAZY_MODULES = ("raven", "flask_cors", "pyinstrument", "boto3")
+
+
+def import_times(module: str) -> Tuple[List[Tuple[str, int, int]], List[str]]:
+    """
+    :return: (name, self us, cumulative us) per imported module and the lazy
+        modules that were imported anyway
+    """
+    check = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=SRC)
+    env.setdefault("AWS_ACCESS_KEY_ID", "fake")
+    env.setdefault("AWS_SECRET_ACCESS_KEY", "fake")
+    result = subprocess.run(  # nosec
+        [sys.executable, "-X", "importtime", "-c", check],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    eager = [name for name in result.stdout.strip().split(",") if name]
+    return timings, eager
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="hub.app")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings, eager = import_times(args.module)
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in timings:
+        packages[name.split(".")[0]] += self_us
+    total_ms = sum(packages.values()) / 1000
+
+    print(f"{'package':<30} {'self ms':>10}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[
+        : args.top
+    ]:
+        print(f"{package:<30} {self_us / 1000:>10.1f}")
+    print(f"{'total':<30} {total_ms:>10.1f}")
+
+    failed = False
+    if eager:
+        print(f"imported eagerly, expected lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(
+            f"import of {args.module} over budget: {total_ms:.1f} > {args.budget_ms} ms"
+        )
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
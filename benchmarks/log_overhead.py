@@ -0,0 +1,104 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Logging overhead per webhook event.  Replays the log calls the webhook path
+makes for an invoice.payment_succeeded event (request body at debug, the
+payload at info in the controller, handler and routes) with the output
+written to /dev/null, at each log level, with the body logged eagerly and
+lazily and with truncation off and info sampling on.  With --async lines are
+queued for the LOG_ASYNC listener thread, and the times are what the
+request thread pays; the queue is flushed between runs:
+
+    python benchmarks/log_overhead.py [--events 2000] [--async]
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import timeit
+
+from os.path import dirname, join, realpath
+
+SRC = join(dirname(dirname(realpath(__file__))), "src")
+FIXTURE = join(
+    SRC,
+    "hub",
+    "tests",
+    "unit",
+    "fixtures",
+    "stripe_invoice_payment_succeeded_new_event.json",
+)
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "fake")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "fake")
+sys.path.insert(0, SRC)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--async", dest="log_async", action="store_true")
+    args = parser.parse_args()
+    if args.log_async:
+        os.environ["LOG_ASYNC"] = "True"
+        os.environ["LOG_QUEUE_SIZE"] = str(args.events * 5)
+
+    from shared import log
+    from shared.cfg import CFG
+    from shared.log import flush_logs, get_logger, lazy
+
+    logger = get_logger()
+    root = logging.getLogger()
+    devnull = open(os.devnull, "w")
+    handlers = log.LOG_LISTENER.handlers if log.LOG_LISTENER else root.handlers
+    for handler in handlers:
+        handler.setStream(devnull)
+
+    with open(FIXTURE, "rb") as f:
+        payload = json.load(f)
+
+    def log_event(body) -> None:
+        logger.debug("Request body", body=body)
+        logger.info("check payload", payload=payload)
+        logger.info("invoice payment succeeded", payload=payload)
+        logger.info("send to routes", message_to_route=payload["data"])
+        logger.info("report route", payload=payload["data"]["object"])
+
+    # The request body is re-encoded for each event to stand in for
+    # request.get_data(); the lazy runs only pay for it when DEBUG is on
+    runs = [
+        ("eager", {}, lambda: log_event(json.dumps(payload))),
+        ("lazy", {}, lambda: log_event(lazy(json.dumps, payload))),
+        (
+            "untruncated",
+            {"LOG_MAX_FIELD_SIZE": "0"},
+            lambda: log_event(lazy(json.dumps, payload)),
+        ),
+        (
+            "sampled 1:10",
+            {"LOG_INFO_SAMPLE_RATE": "10"},
+            lambda: log_event(lazy(json.dumps, payload)),
+        ),
+    ]
+    print("us per event".ljust(10) + "".join(f"{name:>14}" for name, _, _ in runs))
+    for level in ("DEBUG", "INFO", "WARNING"):
+        root.setLevel(level)
+        times = []
+        for _, environ, run in runs:
+            os.environ.update(environ)
+            CFG.reload()
+            times.append(timeit.timeit(run, number=args.events) / args.events * 1e6)
+            flush_logs(timeout=60)
+            for name in environ:
+                del os.environ[name]
+        print(f"{level:<10}" + "".join(f"{time:>14.1f}" for time in times))
+    CFG.reload()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Counts the JSON parse and serialize passes the hub makes per webhook event.
+A signed customer.created event is posted to the webhook view and routed to
+Salesforce, with the basket request stubbed out, and every call into the
+json module or the shared.serialize codec is counted:
+
+    python benchmarks/serialize_passes.py [--events 200] [--codec json]
+
+Fails when an event takes more than one parse or one serialize pass.
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import logging
+import argparse
+
+from collections import Counter
+from hashlib import sha256
+from os.path import dirname, join, realpath
+
+from mock import MagicMock, patch
+
+SRC = join(dirname(dirname(realpath(__file__))), "src")
+FIXTURE = join(
+    SRC, "hub", "tests", "unit", "fixtures", "stripe_cust_created_event.json"
+)
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "fake")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "fake")
+os.environ.pop("HUB_DOCKER", None)
+sys.path.insert(0, SRC)
+
+PASSES: Counter = Counter()
+
+
+def counted(kind, function):
+    def wrapper(*args, **kwargs):
+        PASSES[kind] += 1
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+def signature(body: bytes, secret: str) -> str:
+    timestamp = int(time.time())
+    signed = f"{timestamp}.{body.decode('utf-8')}".encode("utf-8")
+    mac = hmac.new(secret.encode("utf-8"), msg=signed, digestmod=sha256)
+    return f"t={timestamp},v1={mac.hexdigest()}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--codec", default="auto", choices=("auto", "json", "orjson"))
+    args = parser.parse_args()
+
+    import flask
+
+    from shared import serialize
+    from shared.cfg import CFG
+    from hub.routes.salesforce import get_session
+    from hub.vendor import controller
+
+    # Every json module pass, including the ones made by requests and stripe,
+    # goes through these wrappers, and so does the json codec built on them
+    json.dumps = counted("serialize", json.dumps)
+    json.loads = counted("parse", json.loads)
+    if args.codec == "auto":
+        codec = serialize.get_codec()
+    else:
+        codec = serialize.CODECS[args.codec]()
+    if codec.name != "json":
+        codec = serialize.Codec(
+            codec.name,
+            counted("serialize", codec.dumps),
+            counted("parse", codec.loads),
+        )
+    serialize.CODEC = codec
+    # Log records are rendered with json.dumps too; leave them out of the count
+    logging.disable(logging.CRITICAL)
+
+    with open(FIXTURE, "rb") as f:
+        body = f.read()
+    app = flask.Flask(__name__)
+    response = MagicMock(status_code=200)
+    with patch.object(get_session(), "post", return_value=response), patch.object(
+        controller, "is_delivered", return_value=False
+    ):
+        start = time.perf_counter()
+        for _ in range(args.events):
+            headers = {"Stripe-Signature": signature(body, CFG.HUB_API_KEY)}
+            with app.test_request_context(
+                "/v1/hub", method="POST", data=body, headers=headers
+            ):
+                flask.g.hub_table = MagicMock()
+                assert controller.view().status_code == 200  # nosec
+        seconds = time.perf_counter() - start
+        posts = get_session().post.call_count
+
+    parses = PASSES["parse"] / args.events
+    serializes = PASSES["serialize"] / args.events
+    for name, value in (
+        ("codec", codec.name),
+        ("parses per event", f"{parses:.2f}"),
+        ("serializes per event", f"{serializes:.2f}"),
+        ("basket posts", posts),
+        ("us per event", f"{seconds / args.events * 1e6:.1f}"),
+    ):
+        print(f"{name:<22}{value}")
+    return 0 if parses <= 1 and serializes <= 1 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
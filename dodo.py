@@ -24,6 +24,7 @@ from os.path import join, dirname, realpath
 sys.path.insert(0, join(dirname(realpath(__file__)), "src"))
 
 from shared.cfg import CFG, call, CalledProcessError
+from shared.build import write_build_info
 
 DOIT_CONFIG = {"default_tasks": ["pull", "deploy", "count"], "verbosity": 2}
 
@@ -39,6 +40,7 @@ VENV = f"{CFG.REPO_ROOT}/venv"
 PYTHON3 = f"{VENV}/bin/python3.7"
 PIP3 = f"{PYTHON3} -m pip"
 NODE_MODULES = f"{CFG.REPO_ROOT}/node_modules"
+BUILD_INFO = f"{CFG.REPO_ROOT}/src/shared/build_info.py"
 SLS = f"{NODE_MODULES}/serverless/bin/serverless"
 SVCS = [
     svc
@@ -499,6 +501,40 @@ def task_pytest():
         }
 
 
+def task_build_info():
+    """
+    write src/shared/build_info.py so the version and deployed endpoints serve baked-in metadata
+    """
+
+    def build_info():
+        info = write_build_info(BUILD_INFO)
+        print(json.dumps(info, indent=2, sort_keys=True))
+
+    return {"actions": [(build_info,)], "targets": [BUILD_INFO], "uptodate": [False]}
+
+
+def task_provision():
+    """
+    create the DynamoDB tables of the stage being deployed
+    """
+    return {
+        "task_dep": ["check", "creds", "venv"],
+        "actions": [f"cd src && env {envs()} {PYTHON3} -m hub.provision"],
+    }
+
+
+def task_spec():
+    """
+    validate swagger.yaml once and cache it as JSON for create_app
+    """
+    return {
+        "task_dep": ["venv"],
+        "file_dep": ["src/hub/swagger.yaml"],
+        "targets": ["src/hub/swagger.spec.json"],
+        "actions": [f"cd src && {PYTHON3} -m hub.spec"],
+    }
+
+
 def task_package():
     """
     run serverless package -v for every service
@@ -506,7 +542,7 @@ def task_package():
     for svc in SVCS:
         yield {
             "name": svc,
-            "task_dep": ["check", "yarn", "test"],
+            "task_dep": ["check", "yarn", "test", "build_info", "spec"],
             "actions": [
                 f"cd services/{svc} && env {envs()} {SLS} package --stage {CFG.DEPLOYED_ENV} -v"
             ],
@@ -546,7 +582,7 @@ def task_tar():
         cmd = f'cd {CFG.REPO_ROOT}/src/{src} && echo "$(git status -s)" > {CFG.REVISION} && tar cvh {excludes} . | gzip -n > {CFG.SRCTAR} && rm {CFG.REVISION}'
         yield {
             "name": src,
-            "task_dep": ["check:noroot"],
+            "task_dep": ["check:noroot", "build_info", "spec"],
             "actions": [f'echo "{cmd}"', f"{cmd}"],
         }
 
@@ -588,7 +624,15 @@ def task_deploy():
         call(deploy_cmd, stdout=None, stderr=None)
 
     return {
-        "task_dep": ["check", "creds", "yarn", "test"],
+        "task_dep": [
+            "check",
+            "creds",
+            "yarn",
+            "test",
+            "build_info",
+            "spec",
+            "provision",
+        ],
         "pos_arg": "args",
         "actions": [(deploy,)],
     }
@@ -644,7 +688,11 @@ def task_curl():
         funcs = (
             [func]
             if func
-            else [func for func in get_svcs_to_funcs()[svc] if func != "mia"]
+            else [
+                func
+                for func in get_svcs_to_funcs()[svc]
+                if func not in ("mia", "worker")
+            ]
         )
         for func in funcs:
             for route in ("version", "deployed"):
@@ -17,13 +17,30 @@ serverless_wsgi.TEXT_MIME_TYPES.append("application/custom+json")
 # the AWS environment
 sys.path.insert(0, join(dirname(realpath(__file__)), "src"))
 
-from hub.app import create_app
 from shared.cfg import CFG
-from shared.log import get_logger
+from shared import metrics
+from shared.log import flush_logs, get_logger
 
 init(CFG.SENTRY_URL)
 logger = get_logger()
-hub_app = create_app()
+hub_app = None
+
+
+def get_app():
+    """
+    Build the app on the first event rather than at import; the hub package,
+    connexion and Stripe are imported here too
+    """
+    global hub_app
+    if hub_app is None:
+        from hub.app import create_app
+        from hub.shared import vendor
+
+        hub_app = create_app()
+        if CFG.STRIPE_CATALOG_WARM:
+            vendor.warm_catalog_cache()
+    return hub_app
+
 
 # NOTE: The context object has the following available to it.
 #   https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html#python-context-object-props
@@ -31,11 +48,17 @@ hub_app = create_app()
 #   https://github.com/logandk/serverless-wsgi/blob/2911d69a87ae8057110a1dcf0c21288477e07ce1/serverless_wsgi.py#L126
 def handle(event, context):
     try:
-        return serverless_wsgi.handle_request(hub_app.app, event, context)
+        return serverless_wsgi.handle_request(get_app().app, event, context)
     except Exception as e:  # pylint: disable=broad-except
         logger.exception(
             "exception occurred", subhub_event=event, context=context, error=e
         )
         raise
     finally:
-        logger.info("handling hub event", subhub_event=event, context=context)
+        logger.info(
+            "handling hub event",
+            subhub_event=event,
+            context=context,
+            metrics=metrics.snapshot(),
+        )
+        flush_logs()
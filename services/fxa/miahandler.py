@@ -15,7 +15,7 @@ from os.path import join, dirname, realpath
 sys.path.insert(0, join(dirname(realpath(__file__)), "src"))
 
 from hub.verifications import events_check
-from shared.log import get_logger
+from shared.log import flush_logs, get_logger
 from shared.cfg import CFG
 
 init(CFG.SENTRY_URL)
@@ -29,7 +29,10 @@ logger = get_logger()
 def handle(event, context):
     try:
         processing_duration = int(os.getenv("PROCESS_EVENTS_HOURS", "6"))
-        events_check.process_events(processing_duration)
+        reinvocations = 0
+        if isinstance(event, dict):
+            reinvocations = event.get(events_check.REINVOCATIONS_KEY, 0)
+        events_check.process_events(processing_duration, context, reinvocations)
     except Exception as e:  # pylint: disable=broad-except
         logger.exception(
             "exception occurred", subhub_event=event, context=context, error=e
@@ -37,3 +40,4 @@ def handle(event, context):
         raise
     finally:
         logger.info("handling mia event", subhub_event=event, context=context)
+        flush_logs()
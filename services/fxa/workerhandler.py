@@ -0,0 +1,51 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import sys
+
+from sentry_sdk import init
+from os.path import join, dirname, realpath
+
+# First some funky path manipulation so that we can work properly in
+# the AWS environment
+sys.path.insert(0, join(dirname(realpath(__file__)), "src"))
+
+from hub.shared import vendor
+from hub.vendor import worker
+from shared import metrics
+from shared.log import flush_logs, get_logger
+from shared.cfg import CFG
+
+init(CFG.SENTRY_URL)
+
+logger = get_logger()
+
+if CFG.STRIPE_CATALOG_WARM:
+    worker.get_app()  # configures the Stripe api key
+    vendor.warm_catalog_cache()
+
+# NOTE: The context object has the following available to it.
+#   https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html#python-context-object-props
+# NOTE: When triggered by the SQS event source mapping the queued webhook bodies
+# arrive in event["Records"]; any other invocation drains the queue directly.
+def handle(event, context):
+    try:
+        records = event.get("Records") if isinstance(event, dict) else None
+        if records:
+            worker.process_records(records)
+        else:
+            worker.process_queue()
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception(
+            "exception occurred", subhub_event=event, context=context, error=e
+        )
+        raise
+    finally:
+        logger.info(
+            "handling worker event",
+            subhub_event=event,
+            context=context,
+            metrics=metrics.snapshot(),
+        )
+        flush_logs()
@@ -9,30 +9,43 @@ import stripe
 import pynamodb
 
 from flask import current_app, g, jsonify
-from flask_cors import CORS
 from flask import request
-from typing import Any
-from raven import Client
+from typing import Any, Dict, Optional, Tuple
 
+from hub.spec import load_spec, skip_spec_validation
 from shared import secrets
 from shared.exceptions import SubHubError
-from shared.db import HubEvent, SubHubDeletedAccount
+from shared.db import Checkpoint, HubEvent, SubHubDeletedAccount
 from shared.headers import dump_safe_headers
 from shared.cfg import CFG
-from shared.log import get_logger
+from shared.log import get_logger, lazy
 
 logger = get_logger()
-client = Client(CFG.SENTRY_URL)
+
+SENTRY_CLIENT = None
+
+
+def get_sentry_client() -> Any:
+    """
+    raven is only imported once there is an error to report
+    """
+    global SENTRY_CLIENT
+    if SENTRY_CLIENT is None:
+        from raven import Client
+
+        SENTRY_CLIENT = Client(CFG.SENTRY_URL)
+    return SENTRY_CLIENT
+
 
 # Setup Stripe Error handlers
 def intermittent_stripe_error(e):
-    client.captureException()
+    get_sentry_client().captureException()
     logger.error("intermittent stripe error", error=e)
     return jsonify({"message": f"{e.user_message}"}), 503
 
 
 def server_stripe_error(e):
-    client.captureException()
+    get_sentry_client().captureException()
     logger.error("server stripe error", error=e)
     return (
         jsonify(
@@ -43,7 +56,7 @@ def server_stripe_error(e):
 
 
 def server_stripe_error_with_params(e):
-    client.captureException()
+    get_sentry_client().captureException()
     logger.error("server stripe error with params", error=e)
     return (
         jsonify(
@@ -58,13 +71,13 @@ def server_stripe_error_with_params(e):
 
 
 def server_stripe_card_error(e):
-    client.captureException()
+    get_sentry_client().captureException()
     logger.error("server stripe card error", error=e)
     return jsonify({"message": f"{e.user_message}", "code": f"{e.code}"}), 402
 
 
 def database_connection_error(e):
-    client.captureException()
+    get_sentry_client().captureException()
     logger.error("unable to connect to db", error=e)
     return jsonify({"message": "Server Error", "status_code": "bad_connection"}), 500
 
@@ -92,45 +105,70 @@ if is_docker():  # pragma: no cover
     logger.info("Stripe API URL", url=stripe.api_base, local=CFG.STRIPE_LOCAL)
 
 
-def create_app(config=None) -> Any:
-    stripe.timeout = CFG.STRIPE_REQUEST_TIMEOUT
-    logger.info("creating flask app", config=config)
+def dynamodb_location() -> Tuple[str, Optional[str]]:
     region = "localhost"
     host = f"http://dynamodb:{CFG.DYNALITE_PORT}" if is_docker() else CFG.DYNALITE_URL
-    stripe.api_key = CFG.STRIPE_API_KEY
     logger.debug("aws", aws=CFG.AWS_EXECUTION_ENV)
     if CFG.AWS_EXECUTION_ENV:
         region = "us-west-2"
         host = None
+    return region, host
+
+
+def create_tables(region: str, host: Optional[str]) -> Dict[str, Any]:
+    return dict(
+        hub_table=HubEvent(table_name=CFG.EVENT_TABLE, region=region, host=host),
+        subhub_deleted_users=SubHubDeletedAccount(
+            table_name=CFG.DELETED_USER_TABLE, region=region, host=host
+        ),
+        checkpoints=Checkpoint(
+            table_name=CFG.CHECKPOINT_TABLE, region=region, host=host
+        ),
+    )
+
+
+def provision_tables(tables: Dict[str, Any]) -> None:
+    """
+    Create the tables that do not exist yet.  Each check is a DescribeTable
+    call, so deployed Lambdas run with HUB_PROVISION_TABLES off and leave
+    this to `doit provision` at deploy time.
+    :param tables: as returned by create_tables
+    """
+    for table in tables.values():
+        if not table.model.exists():
+            logger.info("creating table", table_name=table.model.Meta.table_name)
+            table.model.create_table(
+                read_capacity_units=1, write_capacity_units=1, wait=True
+            )
+
+
+def create_app(config=None) -> Any:
+    stripe.timeout = CFG.STRIPE_REQUEST_TIMEOUT
+    logger.info("creating flask app", config=config)
+    stripe.api_key = CFG.STRIPE_API_KEY
     options = dict(swagger_ui=CFG.SWAGGER_UI)
 
     app = connexion.FlaskApp(__name__, specification_dir=".", options=options)
-    app.add_api("swagger.yaml", pass_context_arg_name="request", strict_validation=True)
+    spec, validated = load_spec()
+    with skip_spec_validation(validated):
+        app.add_api(spec, pass_context_arg_name="request", strict_validation=True)
 
-    app.app.hub_table = HubEvent(table_name=CFG.EVENT_TABLE, region=region, host=host)
-    app.app.subhub_deleted_users = SubHubDeletedAccount(
-        table_name=CFG.DELETED_USER_TABLE, region=region, host=host
-    )
+    tables = create_tables(*dynamodb_location())
+    for name, table in tables.items():
+        setattr(app.app, name, table)
 
     # Setup error handlers
     @app.app.errorhandler(SubHubError)
     def display_subhub_errors(e: SubHubError):
-        client.captureException()
+        get_sentry_client().captureException()
         if e.status_code == 500:
             logger.error("display hub errors", error=e)
         response = jsonify(e.to_dict())
         response.status_code = e.status_code
         return response
 
-    if not app.app.hub_table.model.exists():
-        app.app.hub_table.model.create_table(
-            read_capacity_units=1, write_capacity_units=1, wait=True
-        )
-
-    if not app.app.subhub_deleted_users.model.exists():
-        app.app.subhub_deleted_users.model.create_table(
-            read_capacity_units=1, write_capacity_units=1, wait=True
-        )
+    if CFG.HUB_PROVISION_TABLES:
+        provision_tables(tables)
 
     for error in (
         stripe.error.APIConnectionError,
@@ -157,9 +195,10 @@ def create_app(config=None) -> Any:
 
     @app.app.before_request
     def before_request():
-        headers = dump_safe_headers(request.headers)
-        logger.debug("Request headers", headers=headers)
-        logger.debug("Request body", body=request.get_data())
+        logger.debug(
+            "Request headers", headers=lazy(dump_safe_headers, request.headers)
+        )
+        logger.debug("Request body", body=lazy(request.get_data))
         g.hub_table = current_app.hub_table
         g.subhub_deleted_users = current_app.subhub_deleted_users
         g.app_system_id = None
@@ -180,6 +219,8 @@ def create_app(config=None) -> Any:
             return app.app.make_response(output_html)
         return response
 
+    from flask_cors import CORS
+
     CORS(app.app)
     return app
 
@@ -0,0 +1,25 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from hub.app import create_tables, provision_tables
+from shared.log import get_logger
+
+logger = get_logger()
+
+
+def main() -> None:
+    """
+    Create the deployed stage's DynamoDB tables, so the Lambdas can start
+    with HUB_PROVISION_TABLES off
+    """
+    tables = create_tables(region="us-west-2", host=None)
+    provision_tables(tables)
+    logger.info(
+        "tables provisioned",
+        tables=[table.model.Meta.table_name for table in tables.values()],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import flask
 
 from abc import ABC
 
+from hub.routes.deliveries import RECENT_DELIVERIES
 from shared.log import get_logger
 
 logger = get_logger()
@@ -21,25 +22,16 @@ class AbstractRoute(ABC):
             event_id = payload["event_id"]
         else:
             event_id = payload["Event_Id__c"]
-        existing = flask.g.hub_table.get_event(event_id)
-        if not existing:
-            created_event = flask.g.hub_table.new_event(
-                event_id=event_id, sent_system=sent_system
-            )
-            saved = flask.g.hub_table.save_event(created_event)
-            try:
-                logger.info("new event created", created_event=created_event)
-            except Exception as e:
-                logger.error("Error logging created", error=e)
-            try:
-                logger.info("new event saved", saved=saved)
-            except Exception as e:
-                logger.error("Error logging saved", error=e)
-        else:
-            updated = flask.g.hub_table.append_event(
-                event_id=event_id, sent_system=sent_system
-            )
-            logger.info("updated event", existing=existing, updated=updated)
+        new_delivery = flask.g.hub_table.record_delivery(
+            event_id=event_id, sent_system=sent_system
+        )
+        logger.info(
+            "event delivery recorded",
+            event_id=event_id,
+            sent_system=sent_system,
+            new_delivery=new_delivery,
+        )
+        RECENT_DELIVERIES.update(event_id, [sent_system])
 
     def report_route_error(self, payload) -> None:
         logger.error("report route error", payload=payload)
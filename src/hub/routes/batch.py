@@ -0,0 +1,218 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import time
+import threading
+import contextvars
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from hub.routes.salesforce import SalesforceRoute, post_to_basket
+from shared import serialize
+from shared.cfg import CFG
+from shared.log import get_logger
+
+logger = get_logger()
+
+ACTIVE_BATCH: contextvars.ContextVar = contextvars.ContextVar(
+    "ACTIVE_BATCH", default=None
+)
+# Messages queued under the same ordering key are posted one after another
+ORDERING_KEY: contextvars.ContextVar = contextvars.ContextVar(
+    "ORDERING_KEY", default=None
+)
+BASKET_EXECUTOR = None
+BASKET_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_basket_executor() -> ThreadPoolExecutor:
+    global BASKET_EXECUTOR
+    with BASKET_EXECUTOR_LOCK:
+        if BASKET_EXECUTOR is None:
+            BASKET_EXECUTOR = ThreadPoolExecutor(
+                max_workers=CFG.SALESFORCE_POOL_SIZE, thread_name_prefix="basket"
+            )
+    return BASKET_EXECUTOR
+
+
+def is_success(status: Optional[int]) -> bool:
+    return status is not None and 200 <= status < 300
+
+
+class SalesforceBatch:
+    """
+    Accumulates Salesforce route messages, from any number of threads, and
+    delivers them together.  A batch is flushed when it holds `max_size`
+    messages, when a message is added after the oldest one has waited
+    `window` seconds, and when the block exits.
+
+    With SALESFORCE_BASKET_BULK_URI set a flush is one bulk POST of the JSON
+    list; otherwise, or if the bulk request fails, each message is posted
+    concurrently over the pooled session.  Messages queued while ORDERING_KEY
+    is set are posted in the order they were added, one at a time per key,
+    and flushes run one at a time so that order holds across flushes too.
+    Delivered messages are recorded with report_route, failures with
+    report_route_error.
+
+        with SalesforceBatch():
+            ...  # RoutesPipeline / AllRoutes sends are queued here
+    """
+
+    def __init__(
+        self, max_size: Optional[int] = None, window: Optional[float] = None
+    ) -> None:
+        self.max_size = max_size or CFG.SALESFORCE_BATCH_SIZE
+        self.window = CFG.SALESFORCE_BATCH_WINDOW if window is None else window
+        self.messages: List[Tuple[Optional[str], Dict[str, Any]]] = []
+        self.opened_at = 0.0
+        self.results: Counter = Counter()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.token = None
+
+    def __enter__(self) -> "SalesforceBatch":
+        self.token = ACTIVE_BATCH.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.flush()
+        finally:
+            ACTIVE_BATCH.reset(self.token)
+            logger.info("salesforce batch closed", results=dict(self.results))
+
+    def add(self, message: Dict[str, Any], key: Optional[str] = None) -> None:
+        with self.lock:
+            if not self.messages:
+                self.opened_at = time.monotonic()
+            self.messages.append((key, message))
+            is_due = (
+                len(self.messages) >= self.max_size
+                or time.monotonic() - self.opened_at >= self.window
+            )
+        if is_due:
+            self.flush()
+
+    def flush(self) -> List[Optional[int]]:
+        """
+        Deliver the queued messages and report each result
+        :return: status per message, None where the request raised
+        """
+        with self.flush_lock:
+            with self.lock:
+                entries, self.messages = self.messages, []
+            if not entries:
+                return []
+            keys = [key for key, _ in entries]
+            messages = [message for _, message in entries]
+            statuses = None
+            if CFG.SALESFORCE_BASKET_BULK_URI:
+                statuses = self.send_bulk(messages)
+            if statuses is None:
+                statuses = self.send_each(messages, keys)
+            self.report(messages, statuses)
+        return statuses
+
+    def report(
+        self, messages: List[Dict[str, Any]], statuses: List[Optional[int]]
+    ) -> None:
+        for message, status in zip(messages, statuses):
+            route = SalesforceRoute(message)
+            delivered = is_success(status)
+            with self.lock:
+                self.results["delivered" if delivered else "failed"] += 1
+            if delivered:
+                route.report_route(message, "salesforce")
+            else:
+                route.report_route_error(message)
+        logger.info(
+            "salesforce batch flushed", size=len(messages), results=dict(self.results)
+        )
+
+    @staticmethod
+    def send_bulk(messages: List[Dict[str, Any]]) -> Optional[List[Optional[int]]]:
+        headers = {"x-api-key": CFG.BASKET_API_KEY}
+        try:
+            response = post_to_basket(CFG.SALESFORCE_BASKET_BULK_URI, messages, headers)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("basket bulk request failed", error=e)
+            return None
+        if not is_success(response.status_code):
+            logger.warning(
+                "basket bulk request failed", status_code=response.status_code
+            )
+            return None
+        return [response.status_code] * len(messages)
+
+    @staticmethod
+    def send_each(
+        messages: List[Dict[str, Any]], keys: Optional[List[Optional[str]]] = None
+    ) -> List[Optional[int]]:
+        """
+        Post each message over the pooled session.  Messages without a key
+        are posted concurrently; those sharing a key are posted in order by a
+        single worker, which stops at the first failure so the rest of that
+        key's messages are not delivered ahead of it.
+        :param messages:
+        :param keys: ordering key per message
+        :return: status per message, None where the request raised or was
+            not sent
+        """
+        if keys is None:
+            keys = [None] * len(messages)
+        # Keyless messages each get a group of their own
+        groups: Dict[Tuple[str, Any], List[int]] = {}
+        for index, key in enumerate(keys):
+            group = ("message", index) if key is None else ("key", key)
+            groups.setdefault(group, []).append(index)
+        executor = get_basket_executor()
+        futures = [
+            executor.submit(
+                SalesforceBatch.send_in_order, [messages[index] for index in indexes]
+            )
+            for indexes in groups.values()
+        ]
+        statuses: List[Optional[int]] = [None] * len(messages)
+        for indexes, future in zip(groups.values(), futures):
+            for index, status in zip(indexes, future.result()):
+                statuses[index] = status
+        return statuses
+
+    @staticmethod
+    def send_in_order(messages: List[Dict[str, Any]]) -> List[Optional[int]]:
+        headers = {"x-api-key": CFG.BASKET_API_KEY}
+        statuses: List[Optional[int]] = []
+        for message in messages:
+            try:
+                status = post_to_basket(
+                    CFG.SALESFORCE_BASKET_URI, message, headers
+                ).status_code
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("basket request failed", error=e)
+                status = None
+            statuses.append(status)
+            if not is_success(status):
+                break
+        skipped = len(messages) - len(statuses)
+        if skipped:
+            logger.warning("ordered basket requests skipped", skipped=skipped)
+        return statuses + [None] * skipped
+
+
+def send_to_salesforce(data: Union[str, Dict[str, Any]]) -> Optional[int]:
+    """
+    Queue data on the active SalesforceBatch, or send it immediately when no
+    batch is open
+    :param data: route message as a dict or JSON string
+    :return: basket status code, None when queued
+    """
+    batch = ACTIVE_BATCH.get()
+    if batch is None:
+        return SalesforceRoute(data).route()
+    batch.add(
+        data if isinstance(data, dict) else serialize.loads(data), ORDERING_KEY.get()
+    )
+    return None
@@ -0,0 +1,74 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import threading
+
+from cachetools import LRUCache
+from typing import Any, FrozenSet, Iterable, Optional
+
+from hub.routes.static import StaticRoutes
+from shared.cfg import CFG
+from shared.log import get_logger
+
+logger = get_logger()
+
+# The sent_system name each route records against an event in the HubEvent table
+SENT_SYSTEMS = {
+    StaticRoutes.FIREFOX_ROUTE: "firefox",
+    StaticRoutes.SALESFORCE_ROUTE: "salesforce",
+}
+
+
+class RecentDeliveries:
+    """
+    Bounded, process-wide LRU of event_id -> systems the event was delivered to.
+    Deliveries only ever grow, so a cached entry can be trusted without going
+    back to DynamoDB; entries are only added once a delivery is known.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.cache: LRUCache = LRUCache(maxsize=maxsize)
+        self.lock = threading.Lock()
+
+    def get(self, event_id: str) -> Optional[FrozenSet[str]]:
+        with self.lock:
+            return self.cache.get(event_id)
+
+    def update(self, event_id: str, sent_systems: Iterable[str]) -> None:
+        with self.lock:
+            self.cache[event_id] = self.cache.get(event_id, frozenset()) | frozenset(
+                sent_systems
+            )
+
+    def clear(self) -> None:
+        with self.lock:
+            self.cache.clear()
+
+
+RECENT_DELIVERIES = RecentDeliveries(CFG.HUB_RECENT_EVENTS_MAXSIZE)
+
+
+def delivered_systems(hub_table: Any, event_id: str) -> FrozenSet[str]:
+    """
+    Systems event_id has already been delivered to, from the in-process LRU
+    when possible and otherwise from a single HubEvent lookup
+    :param hub_table:
+    :param event_id:
+    :return frozenset of sent systems:
+    """
+    cached = RECENT_DELIVERIES.get(event_id)
+    if cached is not None:
+        return cached
+    existing = hub_table.get_event(event_id)
+    if not existing:
+        return frozenset()
+    sent_systems = frozenset(existing.sent_system or [])
+    if sent_systems:
+        RECENT_DELIVERIES.update(event_id, sent_systems)
+    return sent_systems
+
+
+def is_delivered(hub_table: Any, event_id: str, report_routes: Iterable[str]) -> bool:
+    required = {SENT_SYSTEMS[route] for route in report_routes}
+    return bool(required) and required <= delivered_systems(hub_table, event_id)
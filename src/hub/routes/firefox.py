@@ -2,39 +2,49 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import boto3
 import json
 
-from typing import Dict, Any
+from typing import Dict, Any, Union
 from botocore.exceptions import ClientError
 from stripe.error import APIConnectionError
 
 from hub.routes.abstract import AbstractRoute
-from hub.shared.cfg import CFG
+from shared.cfg import CFG
+from shared import serialize
+from shared.aws import get_client
 from shared.log import get_logger
 
 logger = get_logger()
 
 
+def get_sns_client() -> Any:
+    return get_client("sns", region_name=CFG.AWS_REGION)
+
+
+def sns_message(payload: Union[str, Dict[str, Any]]) -> str:
+    if isinstance(payload, dict):
+        payload = serialize.dumps(payload).decode("utf-8")
+    return json.dumps({"default": payload})  # json.dumps is required by FxA
+
+
+def route_payload(payload: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    if isinstance(payload, dict):
+        return payload
+    return serialize.loads(payload)
+
+
 class FirefoxRoute(AbstractRoute):
     def route(self) -> Dict[str, Any]:
         try:
-            sns_client = boto3.client("sns", region_name=CFG.AWS_REGION)
-            response = sns_client.publish(
+            response = get_sns_client().publish(
                 TopicArn=CFG.TOPIC_ARN_KEY,
-                Message=json.dumps(
-                    {"default": self.payload}
-                ),  # json.dumps is required by FxA
+                Message=sns_message(self.payload),
                 MessageStructure="json",
             )
             if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
                 logger.info("message sent to Firefox queue", response=response)
                 logger.info("firefox payload", payload=self.payload)
-                if isinstance(self.payload, dict):
-                    route_payload = self.payload
-                else:
-                    route_payload = json.loads(self.payload)
-                self.report_route(route_payload, "firefox")
+                self.report_route(route_payload(self.payload), "firefox")
                 return response
         except ClientError as e:
             logger.error("Firefox error", error=e)
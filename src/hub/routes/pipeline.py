@@ -4,7 +4,7 @@
 
 from typing import Any, Dict, Optional, List
 
-from hub.routes.salesforce import SalesforceRoute
+from hub.routes import batch
 from hub.routes.static import StaticRoutes
 from hub.shared.exceptions import UnsupportedStaticRouteError, UnsupportedDataError
 
@@ -14,32 +14,30 @@ class RoutesPipeline:
         self.report_routes = report_routes
         self.data = data
 
-    def run(self) -> Optional[Any]:
+    def run(self) -> List[Optional[Any]]:
         for r in self.report_routes:
-            if r == StaticRoutes.SALESFORCE_ROUTE:
-                return self.send_to_salesforce(self.data)
-            else:
+            if r != StaticRoutes.SALESFORCE_ROUTE:
                 raise UnsupportedStaticRouteError(r, StaticRoutes)  # type: ignore
+        return [self.send_to_salesforce(self.data) for _ in self.report_routes]
 
-    def send_to_salesforce(self, data: Dict[str, Any]) -> int:
-        salesforce_send = SalesforceRoute(data).route()
-        return salesforce_send
+    def send_to_salesforce(self, data: Dict[str, Any]) -> Optional[int]:
+        return batch.send_to_salesforce(data)
 
 
 class AllRoutes:
     def __init__(self, messages_to_routes: List[Dict[str, Any]]) -> None:
         self.messages_to_routes = messages_to_routes
 
-    def run(self) -> Optional[Any]:
+    def run(self) -> List[Optional[Any]]:
         for m in self.messages_to_routes:
-            if m["route_type"] == "salesforce_route":
-                return self.send_to_salesforce(data=m.get("data"))
-            else:
+            if m["route_type"] != "salesforce_route":
                 raise UnsupportedDataError(  # type: ignore
                     m, m["route_type"], StaticRoutes
                 )
+        return [
+            self.send_to_salesforce(data=m.get("data")) for m in self.messages_to_routes
+        ]
 
     @staticmethod
-    def send_to_salesforce(data: Dict[str, Any]) -> int:
-        salesforce_send = SalesforceRoute(data).route()
-        return salesforce_send
+    def send_to_salesforce(data: Dict[str, Any]) -> Optional[int]:
+        return batch.send_to_salesforce(data)
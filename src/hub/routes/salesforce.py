@@ -2,28 +2,115 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import json
+import time
+import threading
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
 
-from typing import Dict, Tuple, Any
+from typing import Any, Dict, List, Tuple, Union
+from tenacity import (
+    retry,
+    retry_any,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from hub.routes.abstract import AbstractRoute
+from shared import serialize
 from shared.cfg import CFG
 from shared.log import get_logger
+from shared.metrics import get_histogram
 
 logger = get_logger()
 
+SESSION = None
+SESSION_LOCK = threading.Lock()
+LATENCY = get_histogram("salesforce_basket")
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide pooled session, so warm invocations reuse the keep-alive
+    connection to basket instead of paying a new TCP and TLS handshake.
+    """
+    global SESSION
+    with SESSION_LOCK:
+        if SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=CFG.SALESFORCE_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            SESSION = session
+    return SESSION
+
+
+def is_server_error(response: Response) -> bool:
+    return response.status_code >= 500
+
+
+def last_outcome(retry_state) -> Response:
+    # Hand back the final 5xx response, or raise the final exception
+    return retry_state.outcome.result()
+
+
+@retry(
+    retry=retry_any(
+        # A read timeout may come after basket accepted the POST, so only
+        # failures to connect are safe to send again
+        retry_if_exception_type(
+            (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout)
+        ),
+        retry_if_result(is_server_error),
+    ),
+    wait=wait_random_exponential(multiplier=0.5, max=4),
+    stop=stop_after_attempt(CFG.SALESFORCE_RETRY_ATTEMPTS),
+    retry_error_callback=last_outcome,
+)
+def post_to_basket(
+    url: str,
+    payload: Union[Dict[str, Any], List[Dict[str, Any]]],
+    headers: Dict[str, str],
+):
+    """
+    POST payload to basket, retrying connection errors and 5xx responses
+    with jittered exponential backoff.  Read timeouts are raised, not retried.
+    :param url:
+    :param payload: message dict, or list of them for a bulk request
+    :param headers:
+    :return: Response
+    """
+    body = serialize.dumps(payload)
+    start = time.perf_counter()
+    try:
+        response = get_session().post(
+            url,
+            data=body,
+            headers=dict(headers, **JSON_HEADERS),
+            timeout=(CFG.SALESFORCE_CONNECT_TIMEOUT, CFG.SALESFORCE_READ_TIMEOUT),
+        )
+    except requests.exceptions.RequestException as e:
+        LATENCY.observe(type(e).__name__, time.perf_counter() - start)
+        logger.error("basket request error", error=e)
+        raise
+    LATENCY.observe(response.status_code, time.perf_counter() - start)
+    return response
+
 
 class SalesforceRoute(AbstractRoute):
     def route(self) -> int:
         if isinstance(self.payload, dict):
             route_payload = self.payload
         else:
-            route_payload = json.loads(self.payload)
+            route_payload = serialize.loads(self.payload)
         headers = {"x-api-key": CFG.BASKET_API_KEY}
         basket_url = CFG.SALESFORCE_BASKET_URI
-        request_post = requests.post(basket_url, json=route_payload, headers=headers)
+        request_post = post_to_basket(basket_url, route_payload, headers)
         self.report_route(route_payload, "salesforce")
         logger.info(
             "sending to salesforce", payload=self.payload, request_post=request_post
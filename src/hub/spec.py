@@ -0,0 +1,102 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+import json
+import yaml
+import hashlib
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple
+from connexion.spec import Swagger2Specification
+
+from shared.log import get_logger
+
+logger = get_logger()
+
+SPEC_PATH = os.path.join(os.path.dirname(__file__), "swagger.yaml")
+SPEC_CACHE_PATH = os.path.join(os.path.dirname(__file__), "swagger.spec.json")
+
+
+def spec_hash(path: str = SPEC_PATH) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_yaml_spec(path: str = SPEC_PATH) -> Dict[str, Any]:
+    """
+    swagger.yaml parsed with libyaml when it is available, which is several
+    times faster than the pure Python loader connexion would use
+    """
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path) as f:
+        return yaml.load(f, Loader=loader)  # nosec
+
+
+def build_spec_cache(
+    path: str = SPEC_PATH, cache_path: str = SPEC_CACHE_PATH
+) -> Dict[str, Any]:
+    """
+    Validate the spec and write it as JSON along with the hash of the YAML
+    it came from
+    :param path: swagger.yaml
+    :param cache_path: file to write
+    :return: the validated spec
+    """
+    from openapi_spec_validator import validate_v2_spec
+
+    # JSON only has string keys, e.g. for response codes, as connexion expects,
+    # and YAML timestamps in examples become ISO 8601 strings
+    spec = json.loads(
+        json.dumps(load_yaml_spec(path), default=lambda value: value.isoformat())
+    )
+    validate_v2_spec(spec)
+    with open(cache_path, "w") as f:
+        json.dump(dict(sha256=spec_hash(path), spec=spec), f, sort_keys=True)
+    logger.info("spec cache written", cache_path=cache_path)
+    return spec
+
+
+def load_spec(
+    path: str = SPEC_PATH, cache_path: str = SPEC_CACHE_PATH
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    The validated spec from the cache written by `doit spec`, or the YAML
+    itself when there is no cache or it was built from a different YAML
+    :param path: swagger.yaml
+    :param cache_path: spec cache
+    :return: the spec and whether it has already been validated
+    """
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        logger.debug("no spec cache", cache_path=cache_path)
+        return load_yaml_spec(path), False
+    if cache.get("sha256") != spec_hash(path):
+        logger.warning("stale spec cache", cache_path=cache_path)
+        return load_yaml_spec(path), False
+    return cache["spec"], True
+
+
+@contextmanager
+def skip_spec_validation(skip: bool = True) -> Iterator[None]:
+    """
+    Stop connexion validating the specs it loads, for a spec that was
+    validated when it was cached.  Only meant for app start-up, as the
+    validator is swapped out for the whole process.
+    """
+    if not skip:
+        yield
+        return
+    validate = Swagger2Specification.__dict__["_validate_spec"]
+    Swagger2Specification._validate_spec = classmethod(lambda cls, spec: None)
+    try:
+        yield
+    finally:
+        Swagger2Specification._validate_spec = validate
+
+
+if __name__ == "__main__":
+    build_spec_cache()
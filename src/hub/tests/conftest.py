@@ -13,7 +13,9 @@ import stripe
 
 from flask import g
 
+from hub.shared import vendor
 from hub.shared.cfg import CFG
+from shared import cfg
 from hub.app import create_app
 from shared.log import get_logger
 from shared.dynamodb import dynamodb
@@ -21,20 +23,34 @@ from shared.dynamodb import dynamodb
 logger = get_logger()
 
 
+def reload_config():
+    # hub.shared is a symlink to shared, so each import path has its own CFG
+    CFG.reload()
+    cfg.CFG.reload()
+
+
 def pytest_configure():
     # Latest boto3 now wants fake credentials around, so here we are.
     os.environ["AWS_ACCESS_KEY_ID"] = "fake"
     os.environ["AWS_SECRET_ACCESS_KEY"] = "fake"
     os.environ["EVENT_TABLE"] = "events-testing"
     os.environ["ALLOWED_ORIGIN_SYSTEMS"] = "Test_system,Test_System,Test_System1"
+    reload_config()
     sys._called_from_test = True
 
 
 @pytest.fixture(autouse=True, scope="module")
 def app(dynamodb):
     os.environ["DYNALITE_URL"] = dynamodb
+    reload_config()
     app = create_app()
     with app.app.app_context():
         g.hub_table = app.app.hub_table
         g.subhub_deleted_users = app.app.subhub_deleted_users
         yield app
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog_cache():
+    vendor.clear_catalog_cache()
+    yield
@@ -0,0 +1,151 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import requests
+
+from unittest import TestCase
+from mock import MagicMock, patch
+
+from hub.routes.batch import ORDERING_KEY, SalesforceBatch, send_to_salesforce
+from hub.routes.pipeline import AllRoutes, RoutesPipeline
+from hub.routes.static import StaticRoutes
+
+BULK_URI = "shared.cfg.AutoConfigPlus.SALESFORCE_BASKET_BULK_URI"
+
+
+def response(status_code):
+    return MagicMock(status_code=status_code)
+
+
+def message(event_id):
+    return {"Event_Id__c": event_id, "Event_Name__c": "test"}
+
+
+class SalesforceBatchTest(TestCase):
+    def setUp(self) -> None:
+        post_patcher = patch("hub.routes.batch.post_to_basket")
+        route_patcher = patch("hub.routes.salesforce.SalesforceRoute.route")
+        report_patcher = patch("hub.routes.salesforce.SalesforceRoute.report_route")
+        error_patcher = patch(
+            "hub.routes.salesforce.SalesforceRoute.report_route_error"
+        )
+        bulk_uri_patcher = patch(BULK_URI, "")
+        for patcher in (
+            post_patcher,
+            route_patcher,
+            report_patcher,
+            error_patcher,
+            bulk_uri_patcher,
+        ):
+            self.addCleanup(patcher.stop)
+        self.mock_post = post_patcher.start()
+        self.mock_route = route_patcher.start()
+        self.mock_report = report_patcher.start()
+        self.mock_report_error = error_patcher.start()
+        bulk_uri_patcher.start()
+
+    def test_unbatched_sends_immediately(self):
+        self.mock_route.return_value = 200
+        assert send_to_salesforce(message("evt_1")) == 200
+        self.mock_post.assert_not_called()
+
+    def test_routes_pipeline_sends_every_route(self):
+        self.mock_route.return_value = 200
+        routes = [StaticRoutes.SALESFORCE_ROUTE, StaticRoutes.SALESFORCE_ROUTE]
+        assert RoutesPipeline(routes, json.dumps(message("evt_1"))).run() == [200, 200]
+
+    def test_all_routes_sends_every_message(self):
+        self.mock_route.return_value = 200
+        messages = [
+            dict(route_type="salesforce_route", data=message("evt_1")),
+            dict(route_type="salesforce_route", data=message("evt_2")),
+        ]
+        assert AllRoutes(messages).run() == [200, 200]
+        assert self.mock_route.call_count == 2
+
+    def test_flush_on_exit(self):
+        self.mock_post.return_value = response(200)
+        with SalesforceBatch(max_size=10, window=60) as batch:
+            RoutesPipeline(
+                [StaticRoutes.SALESFORCE_ROUTE], json.dumps(message("evt_1"))
+            ).run()
+            send_to_salesforce(message("evt_2"))
+            self.mock_post.assert_not_called()
+        assert self.mock_post.call_count == 2
+        assert self.mock_report.call_count == 2
+        assert batch.results == {"delivered": 2}
+        self.mock_route.assert_not_called()
+
+    def test_flush_on_size(self):
+        self.mock_post.return_value = response(200)
+        with SalesforceBatch(max_size=2, window=60):
+            send_to_salesforce(message("evt_1"))
+            send_to_salesforce(message("evt_2"))
+            assert self.mock_post.call_count == 2
+            send_to_salesforce(message("evt_3"))
+            assert self.mock_post.call_count == 2
+        assert self.mock_post.call_count == 3
+
+    def test_flush_on_window(self):
+        self.mock_post.return_value = response(200)
+        with SalesforceBatch(max_size=10, window=0):
+            send_to_salesforce(message("evt_1"))
+            assert self.mock_post.call_count == 1
+
+    def test_per_message_results(self):
+        self.mock_post.side_effect = [
+            response(200),
+            response(500),
+            requests.exceptions.ReadTimeout("slow"),
+        ]
+        with SalesforceBatch(max_size=3, window=60) as batch:
+            for event_id in ("evt_1", "evt_2", "evt_3"):
+                send_to_salesforce(message(event_id))
+        self.mock_report.assert_called_once_with(message("evt_1"), "salesforce")
+        assert self.mock_report_error.call_count == 2
+        assert batch.results == {"delivered": 1, "failed": 2}
+
+    def test_bulk(self):
+        self.mock_post.return_value = response(202)
+        with patch(BULK_URI, "http://bulk"):
+            with SalesforceBatch(max_size=10, window=60):
+                send_to_salesforce(message("evt_1"))
+                send_to_salesforce(message("evt_2"))
+        self.mock_post.assert_called_once()
+        assert self.mock_post.call_args[0][:2] == (
+            "http://bulk",
+            [message("evt_1"), message("evt_2")],
+        )
+        assert self.mock_report.call_count == 2
+
+    def test_bulk_failure_falls_back(self):
+        self.mock_post.side_effect = [response(404), response(200), response(200)]
+        with patch(BULK_URI, "http://bulk"):
+            with SalesforceBatch(max_size=10, window=60):
+                send_to_salesforce(message("evt_1"))
+                send_to_salesforce(message("evt_2"))
+        assert self.mock_post.call_count == 3
+        assert self.mock_report.call_count == 2
+
+    def test_ordered_messages_posted_in_sequence(self):
+        posted = []
+
+        def post(uri, data, headers):
+            posted.append(data["Event_Id__c"])
+            return response(500 if data["Event_Id__c"] == "evt_2" else 200)
+
+        self.mock_post.side_effect = post
+        with SalesforceBatch(max_size=10, window=60) as batch:
+            token = ORDERING_KEY.set("cus_1")
+            for event_id in ("evt_1", "evt_2", "evt_3"):
+                send_to_salesforce(message(event_id))
+            ORDERING_KEY.reset(token)
+            send_to_salesforce(message("evt_4"))
+        assert posted.index("evt_1") < posted.index("evt_2")
+        # evt_3 is held back behind the failed evt_2 of the same customer
+        assert "evt_3" not in posted
+        assert "evt_4" in posted
+        assert batch.results == {"delivered": 2, "failed": 2}
+        self.mock_report_error.assert_any_call(message("evt_3"))
@@ -0,0 +1,73 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from unittest import TestCase
+from mock import MagicMock, patch
+
+from hub.routes.deliveries import (
+    RECENT_DELIVERIES,
+    RecentDeliveries,
+    delivered_systems,
+    is_delivered,
+)
+from hub.routes.static import StaticRoutes
+from hub.vendor.controller import StripeHubEventPipeline
+
+
+class DeliveriesTest(TestCase):
+    def setUp(self) -> None:
+        RECENT_DELIVERIES.clear()
+        self.addCleanup(RECENT_DELIVERIES.clear)
+        self.hub_table = MagicMock()
+
+    def test_unknown_event(self):
+        self.hub_table.get_event.return_value = None
+        assert delivered_systems(self.hub_table, "evt_1") == frozenset()
+        assert not is_delivered(
+            self.hub_table, "evt_1", [StaticRoutes.SALESFORCE_ROUTE]
+        )
+
+    def test_delivered_event_is_cached(self):
+        self.hub_table.get_event.return_value = MagicMock(sent_system=["salesforce"])
+        assert is_delivered(self.hub_table, "evt_1", [StaticRoutes.SALESFORCE_ROUTE])
+        assert is_delivered(self.hub_table, "evt_1", [StaticRoutes.SALESFORCE_ROUTE])
+        self.hub_table.get_event.assert_called_once_with("evt_1")
+
+    def test_partial_delivery(self):
+        RECENT_DELIVERIES.update("evt_1", ["firefox"])
+        assert not is_delivered(
+            self.hub_table,
+            "evt_1",
+            [StaticRoutes.FIREFOX_ROUTE, StaticRoutes.SALESFORCE_ROUTE],
+        )
+
+    def test_handlers_without_routes_always_run(self):
+        assert not is_delivered(self.hub_table, "evt_1", [])
+        self.hub_table.get_event.assert_not_called()
+
+    def test_lru_is_bounded(self):
+        recent = RecentDeliveries(maxsize=2)
+        for event_id in ("evt_1", "evt_2", "evt_3"):
+            recent.update(event_id, ["salesforce"])
+        assert recent.get("evt_1") is None
+        assert recent.get("evt_3") == frozenset(["salesforce"])
+
+
+class DuplicateGateTest(TestCase):
+    def setUp(self) -> None:
+        RECENT_DELIVERIES.clear()
+        self.addCleanup(RECENT_DELIVERIES.clear)
+        handler_patcher = patch("hub.vendor.customer.StripeCustomerCreated.run")
+        self.addCleanup(handler_patcher.stop)
+        self.mock_run = handler_patcher.start()
+
+    def test_duplicate_is_skipped(self):
+        RECENT_DELIVERIES.update("evt_dup", ["salesforce"])
+        StripeHubEventPipeline({"id": "evt_dup", "type": "customer.created"}).run()
+        self.mock_run.assert_not_called()
+
+    def test_new_event_runs(self):
+        with patch("hub.vendor.controller.is_delivered", return_value=False):
+            StripeHubEventPipeline({"id": "evt_new", "type": "customer.created"}).run()
+        self.mock_run.assert_called_once()
@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import boto3
+
+from unittest import TestCase
+from mock import patch
+from botocore.stub import Stubber
+
+from hub.routes.firefox import FirefoxRoute
+from shared.cfg import CFG
+from shared import aws
+
+
+def message(event_id):
+    return {"event_id": event_id, "event_type": "test"}
+
+
+class FirefoxRouteTest(TestCase):
+    def setUp(self) -> None:
+        aws.clear_clients()
+        self.addCleanup(aws.clear_clients)
+        self.sns_client = boto3.session.Session().client(
+            "sns",
+            region_name=CFG.AWS_REGION,
+            aws_access_key_id="fake",
+            aws_secret_access_key="fake",
+        )
+        self.stubber = Stubber(self.sns_client)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+        client_patcher = patch("boto3.client", return_value=self.sns_client)
+        report_patcher = patch("hub.routes.firefox.FirefoxRoute.report_route")
+        error_patcher = patch("hub.routes.firefox.FirefoxRoute.report_route_error")
+        for patcher in (client_patcher, report_patcher, error_patcher):
+            self.addCleanup(patcher.stop)
+        self.mock_boto_client = client_patcher.start()
+        self.mock_report = report_patcher.start()
+        self.mock_report_error = error_patcher.start()
+
+    def test_route_reuses_client(self):
+        for event_id in ("evt_1", "evt_2"):
+            self.stubber.add_response(
+                "publish",
+                {
+                    "MessageId": event_id,
+                    "ResponseMetadata": {"HTTPStatusCode": 200},
+                },
+                {
+                    "TopicArn": CFG.TOPIC_ARN_KEY,
+                    "Message": json.dumps({"default": json.dumps(message(event_id))}),
+                    "MessageStructure": "json",
+                },
+            )
+            assert FirefoxRoute(json.dumps(message(event_id))).route()
+        self.mock_boto_client.assert_called_once()
+        assert self.mock_report.call_count == 2
+        self.stubber.assert_no_pending_responses()
+
+    def test_route_reads_reloaded_config(self):
+        # CFG.reload() after secrets are loaded must reach the route's config
+        from hub.routes import firefox
+        from shared import cfg
+
+        assert firefox.CFG is cfg.CFG
@@ -0,0 +1,101 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import requests
+
+from unittest import TestCase
+from mock import MagicMock, patch
+
+from hub.routes import salesforce
+from hub.routes.salesforce import SalesforceRoute, get_session, post_to_basket
+from shared import serialize
+from shared.cfg import CFG
+
+
+def response(status_code):
+    return MagicMock(status_code=status_code)
+
+
+class SalesforceRouteTest(TestCase):
+    def setUp(self) -> None:
+        post_patcher = patch.object(get_session(), "post")
+        sleep_patcher = patch.object(post_to_basket.retry, "sleep")
+        report_patcher = patch("hub.routes.salesforce.SalesforceRoute.report_route")
+        self.addCleanup(post_patcher.stop)
+        self.addCleanup(sleep_patcher.stop)
+        self.addCleanup(report_patcher.stop)
+        self.mock_post = post_patcher.start()
+        self.mock_sleep = sleep_patcher.start()
+        self.mock_report = report_patcher.start()
+        salesforce.LATENCY.reset()
+        self.payload = {"Event_Id__c": "evt_1", "Event_Name__c": "test"}
+
+    def test_session_reused(self):
+        assert get_session() is get_session()
+
+    def test_route(self):
+        self.mock_post.return_value = response(200)
+
+        assert SalesforceRoute(self.payload).route() == 200
+
+        self.mock_post.assert_called_once_with(
+            CFG.SALESFORCE_BASKET_URI,
+            data=serialize.dumps(self.payload),
+            headers={
+                "x-api-key": CFG.BASKET_API_KEY,
+                "Content-Type": "application/json",
+            },
+            timeout=(CFG.SALESFORCE_CONNECT_TIMEOUT, CFG.SALESFORCE_READ_TIMEOUT),
+        )
+        self.mock_report.assert_called_once_with(self.payload, "salesforce")
+        assert salesforce.LATENCY.snapshot()["200"]["count"] == 1
+
+    def test_retry_server_error(self):
+        self.mock_post.side_effect = [response(502), response(200)]
+
+        assert SalesforceRoute(self.payload).route() == 200
+        assert self.mock_post.call_count == 2
+        assert self.mock_sleep.call_count == 1
+
+    def test_retry_exhausted_returns_last_response(self):
+        self.mock_post.return_value = response(503)
+
+        assert SalesforceRoute(self.payload).route() == 503
+        assert self.mock_post.call_count == CFG.SALESFORCE_RETRY_ATTEMPTS
+        assert salesforce.LATENCY.snapshot()["503"]["count"] == (
+            CFG.SALESFORCE_RETRY_ATTEMPTS
+        )
+
+    def test_retry_connection_error(self):
+        self.mock_post.side_effect = [
+            requests.exceptions.ConnectionError("reset"),
+            response(201),
+        ]
+
+        assert SalesforceRoute(self.payload).route() == 201
+        assert salesforce.LATENCY.snapshot()["ConnectionError"]["count"] == 1
+
+    def test_timeout_raised(self):
+        self.mock_post.side_effect = requests.exceptions.ReadTimeout("slow")
+
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            SalesforceRoute(self.payload).route()
+        # Basket may have accepted the request, so it is not sent again
+        self.mock_post.assert_called_once()
+        self.mock_report.assert_not_called()
+
+    def test_retry_connect_timeout(self):
+        self.mock_post.side_effect = [
+            requests.exceptions.ConnectTimeout("unreachable"),
+            response(200),
+        ]
+
+        assert SalesforceRoute(self.payload).route() == 200
+        assert self.mock_post.call_count == 2
+
+    def test_client_error_not_retried(self):
+        self.mock_post.return_value = response(400)
+
+        assert SalesforceRoute(self.payload).route() == 400
+        self.mock_post.assert_called_once()
@@ -0,0 +1,56 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import mock
+import unittest
+import json
+
+from stripe.util import convert_to_stripe_object
+
+from hub.shared import vendor
+from hub.vendor.catalog import StripePlanChanged, StripeProductChanged
+from hub.vendor.registry import EVENT_HANDLERS
+
+
+def catalog_event(event_type, object_id):
+    return {
+        "id": "evt_catalog",
+        "type": event_type,
+        "data": {"object": {"id": object_id}},
+    }
+
+
+class StripeCatalogChangedTest(unittest.TestCase):
+    def setUp(self) -> None:
+        with open("src/hub/tests/unit/fixtures/stripe_prod_test1.json") as fh:
+            self.product = convert_to_stripe_object(json.loads(fh.read()))
+        with open("src/hub/tests/unit/fixtures/stripe_plan_test1.json") as fh:
+            self.plan = convert_to_stripe_object(json.loads(fh.read()))
+        vendor.clear_catalog_cache()
+        vendor.PRODUCT_CACHE.put(self.product["id"], self.product)
+        vendor.PLAN_CACHE.put(self.plan["id"], self.plan)
+
+    def test_registered(self):
+        for event_type in ("plan.updated", "plan.deleted"):
+            assert event_type in EVENT_HANDLERS
+        for event_type in ("product.updated", "product.deleted"):
+            assert event_type in EVENT_HANDLERS
+
+    def test_plan_updated(self):
+        did_route = StripePlanChanged(
+            catalog_event("plan.updated", self.plan["id"])
+        ).run()
+        assert not did_route
+        assert vendor.PLAN_CACHE.stats()["size"] == 0
+        assert vendor.PRODUCT_CACHE.stats()["size"] == 1
+
+    @mock.patch("stripe.Product.retrieve")
+    def test_product_updated(self, mock_product):
+        mock_product.return_value = self.product
+        did_route = StripeProductChanged(
+            catalog_event("product.updated", self.product["id"])
+        ).run()
+        assert not did_route
+        vendor.retrieve_stripe_product(self.product["id"])
+        mock_product.assert_called_once_with(self.product["id"])
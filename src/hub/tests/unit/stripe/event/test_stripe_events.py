@@ -4,6 +4,7 @@
 
 import os
 import time
+import threading
 import json
 import boto3
 import flask
@@ -11,8 +12,10 @@ import stripe
 import requests
 
 from flask import Response
+from mock import MagicMock, patch
 from mockito import when, mock, unstub
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 
 from hub.tests import conftest
 
@@ -89,6 +92,7 @@ def test_retrieve_events_more():
 
 def test_process_events(dynamodb):
     os.environ["DYNALITE_URL"] = dynamodb
+    conftest.reload_config()
     missing_event = "event.json"
     from hub.verifications.events_check import process_events
 
@@ -104,3 +108,445 @@ def test_process_events(dynamodb):
         ).thenReturn(event_response)
         process_events(6)
     unstub()
+
+
+def missing_event(event_id, customer, created):
+    return {
+        "id": event_id,
+        "created": created,
+        "data": {"object": {"object": "invoice", "customer": customer}},
+    }
+
+
+def test_retrieve_events_checks_page_once():
+    from hub.verifications.events_check import EventCheck
+
+    evt_2 = missing_event("evt_2", "cus_1", 1)
+    events = SimpleNamespace(
+        data=[missing_event("evt_1", "cus_1", 0), evt_2], has_more=False
+    )
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {"evt_1": MagicMock(event_id="evt_1")}
+    with patch.object(flask.g, "hub_table", hub_table), patch.object(
+        EventCheck, "get_events", return_value=events
+    ), patch.object(
+        EventCheck, "process_missing_event", return_value=Response(status=200)
+    ) as process_missing_event:
+        EventCheck(6).retrieve_events("")
+
+    hub_table.get_events.assert_called_once_with(["evt_1", "evt_2"])
+    hub_table.get_event.assert_not_called()
+    process_missing_event.assert_called_once_with(evt_2)
+
+
+def test_replay_missing_events_orders_per_customer():
+    from hub.routes.batch import ORDERING_KEY
+    from hub.verifications.events_check import EventCheck
+
+    replayed = []
+    lock = threading.Lock()
+    both_started = threading.Barrier(2, timeout=5)
+
+    def process(event):
+        # Route messages are queued under the customer's ordering key
+        assert ORDERING_KEY.get() == event["data"]["object"]["customer"]
+        if event["created"] == 1:
+            # The first event of each customer waits for the other customer,
+            # proving the two customers are replayed concurrently
+            both_started.wait()
+        with lock:
+            replayed.append(event["id"])
+        if event["id"] == "evt_b2":
+            return Response(status=500)
+        return Response(status=200)
+
+    events = [
+        missing_event("evt_a2", "cus_a", 2),
+        missing_event("evt_b2", "cus_b", 2),
+        missing_event("evt_a1", "cus_a", 1),
+        missing_event("evt_b1", "cus_b", 1),
+    ]
+    with patch.object(EventCheck, "process_missing_event", side_effect=process):
+        summary = EventCheck(6).replay_missing_events(events)
+
+    assert replayed.index("evt_a1") < replayed.index("evt_a2")
+    assert replayed.index("evt_b1") < replayed.index("evt_b2")
+    assert summary["replayed"] == 3
+    assert summary["failed"] == 1
+    assert summary["failed_events"] == ["evt_b2"]
+    assert summary["customers"] == 2
+    assert ORDERING_KEY.get() is None
+
+
+def test_customer_key():
+    from hub.verifications.events_check import EventCheck
+
+    customer_event = {
+        "id": "evt_1",
+        "data": {"object": {"object": "customer", "id": "cus_1"}},
+    }
+    assert EventCheck.customer_key(customer_event) == "cus_1"
+    assert EventCheck.customer_key(missing_event("evt_2", "cus_2", 1)) == "cus_2"
+    assert EventCheck.customer_key(missing_event("evt_3", None, 1)) == "evt_3"
+
+
+def event_page(*events, has_more=False):
+    return SimpleNamespace(data=list(events), has_more=has_more)
+
+
+REPLAYED = dict(replayed=0, failed=0, failed_events=[])
+
+
+def test_retrieve_events_saves_checkpoint():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    checkpoints = LocalCheckpoint()
+    checkpoints.save_checkpoint = MagicMock(wraps=checkpoints.save_checkpoint)
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {}
+    first_page = event_page(
+        missing_event("evt_3", "cus_1", 30),
+        missing_event("evt_2", "cus_1", 20),
+        has_more=True,
+    )
+    second_page = event_page(missing_event("evt_1", "cus_1", 10))
+    event_check = EventCheck(6, checkpoints=checkpoints)
+    with patch.object(flask.g, "hub_table", hub_table), patch.object(
+        EventCheck, "get_events", return_value=first_page
+    ), patch.object(
+        EventCheck, "get_events_with_last_event", return_value=second_page
+    ) as get_events_with_last_event, patch.object(
+        EventCheck, "replay_missing_events", return_value=REPLAYED
+    ):
+        event_check.retrieve_events("")
+
+    since = get_events_with_last_event.call_args[0][1]
+    get_events_with_last_event.assert_called_once_with("evt_2", since)
+    assert checkpoints.save_checkpoint.call_args_list[0][1] == dict(
+        watermark=None, cursor="evt_2", scan_since=since, scan_until=30
+    )
+    assert checkpoints.get_checkpoint(CHECKPOINT_NAME) == dict(
+        watermark=30, cursor=None, scan_since=None, scan_until=None
+    )
+
+
+def test_retrieve_events_resumes_from_cursor():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    event_check = EventCheck(6, checkpoints=LocalCheckpoint())
+    scan_since = event_check.get_time_h_hours_ago(1)
+    event_check.checkpoints.save_checkpoint(
+        CHECKPOINT_NAME,
+        watermark=scan_since - 60,
+        cursor="evt_2",
+        scan_since=scan_since,
+        scan_until=scan_since + 600,
+    )
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {}
+    with patch.object(flask.g, "hub_table", hub_table), patch.object(
+        EventCheck, "get_events"
+    ) as get_events, patch.object(
+        EventCheck,
+        "get_events_with_last_event",
+        return_value=event_page(missing_event("evt_1", "cus_1", scan_since + 1)),
+    ) as get_events_with_last_event, patch.object(
+        EventCheck, "replay_missing_events", return_value=REPLAYED
+    ):
+        event_check.retrieve_events("")
+
+    get_events.assert_not_called()
+    get_events_with_last_event.assert_called_once_with("evt_2", scan_since)
+    assert event_check.checkpoints.get_checkpoint(CHECKPOINT_NAME)["watermark"] == (
+        scan_since + 600
+    )
+
+
+def test_retrieve_events_starts_at_watermark():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    event_check = EventCheck(6, checkpoints=LocalCheckpoint())
+    watermark = event_check.get_time_h_hours_ago(1)
+    event_check.checkpoints.save_checkpoint(CHECKPOINT_NAME, watermark=watermark)
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {}
+    with patch.object(flask.g, "hub_table", hub_table), patch.object(
+        EventCheck, "get_events", return_value=event_page()
+    ) as get_events, patch.object(
+        EventCheck, "replay_missing_events", return_value=REPLAYED
+    ):
+        event_check.retrieve_events("")
+
+    get_events.assert_called_once_with(watermark - CFG.MIA_CHECKPOINT_OVERLAP)
+    assert event_check.checkpoints.get_checkpoint(CHECKPOINT_NAME)["watermark"] == (
+        watermark
+    )
+
+
+def test_retrieve_events_stops_at_deadline():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {}
+    event_check = EventCheck(6, checkpoints=LocalCheckpoint())
+    first_page = event_page(
+        missing_event("evt_3", "cus_1", 30),
+        missing_event("evt_2", "cus_1", 20),
+        has_more=True,
+    )
+
+    def get_events(since):
+        # The first page uses up the time budget
+        event_check.deadline = time.monotonic()
+        return first_page
+
+    with patch.object(flask.g, "hub_table", hub_table), patch.object(
+        EventCheck, "get_events", side_effect=get_events
+    ), patch.object(
+        EventCheck, "get_events_with_last_event"
+    ) as get_events_with_last_event, patch.object(
+        EventCheck, "replay_missing_events", return_value=REPLAYED
+    ):
+        summary = event_check.retrieve_events("")
+
+    get_events_with_last_event.assert_not_called()
+    assert not summary["completed"]
+    assert summary["number_of_events"] == 2
+    checkpoint = event_check.checkpoints.get_checkpoint(CHECKPOINT_NAME)
+    assert checkpoint["cursor"] == "evt_2"
+    assert checkpoint["watermark"] is None
+
+
+def test_coverage():
+    from hub.verifications.events_check import EventCheck
+
+    assert EventCheck.coverage(0, 100, 75, False) == 0.25
+    assert EventCheck.coverage(0, 100, 75, True) == 1.0
+    assert EventCheck.coverage(0, None, None, False) == 0.0
+
+
+def test_reinvoke():
+    from hub.verifications import events_check
+
+    context = SimpleNamespace(invoked_function_arn="arn:aws:lambda:mia")
+    with patch("shared.cfg.AutoConfigPlus.MIA_MAX_REINVOCATIONS", 2), patch.object(
+        events_check, "get_client"
+    ) as get_client:
+        assert events_check.reinvoke(context, 1)
+        assert not events_check.reinvoke(context, 2)
+
+    get_client.return_value.invoke.assert_called_once_with(
+        FunctionName="arn:aws:lambda:mia",
+        InvocationType="Event",
+        Payload=json.dumps({events_check.REINVOCATIONS_KEY: 2}),
+    )
+
+
+def test_deadline_from_context():
+    from hub.verifications.events_check import deadline_from_context
+
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 60000
+    assert 59 < deadline_from_context(context) - time.monotonic() <= 60
+    assert deadline_from_context(None) is None
+
+
+def test_deadline_margin_short_timeout():
+    from hub.verifications.events_check import EventCheck, deadline_from_context
+
+    # The mia function runs with a 10 second timeout, less than the margin
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 10000
+    with patch("shared.cfg.AutoConfigPlus.MIA_DEADLINE_MARGIN", 30):
+        event_check = EventCheck(6, deadline=deadline_from_context(context))
+    assert 2 < event_check.margin <= 2.5
+    assert not event_check.out_of_time()
+    event_check.deadline = time.monotonic() + 2
+    assert event_check.out_of_time()
+
+
+def test_retrieve_events_sharded():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    def get_events(since, until):
+        # evt_dup is listed by every shard, the way an event on a boundary could be
+        return event_page(
+            missing_event(f"evt_{until}", "cus_1", until),
+            missing_event("evt_dup", "cus_2", since + 1),
+        )
+
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {}
+    event_check = EventCheck(6, checkpoints=LocalCheckpoint())
+    with patch("shared.cfg.AutoConfigPlus.MIA_SCAN_SHARDS", 3), patch.object(
+        flask.g, "hub_table", hub_table
+    ), patch.object(
+        EventCheck, "get_events", side_effect=get_events
+    ) as get_events_mock, patch.object(
+        EventCheck, "replay_missing_events", return_value=REPLAYED
+    ) as replay_missing_events:
+        summary = event_check.retrieve_events("")
+
+    windows = sorted(call[0] for call in get_events_mock.call_args_list)
+    assert len(windows) == 3
+    assert windows[0][1] == windows[1][0] and windows[1][1] == windows[2][0]
+    assert summary["completed"]
+    assert summary["coverage"] == 1.0
+    assert summary["number_of_events"] == 6
+    replayed = [event["id"] for event in replay_missing_events.call_args[0][0]]
+    assert sorted(replayed) == sorted(
+        [f"evt_{until}" for _, until in windows] + ["evt_dup"]
+    )
+    checkpoint = event_check.checkpoints.get_checkpoint(CHECKPOINT_NAME)
+    assert checkpoint["watermark"] == windows[2][1]
+
+
+def test_retrieve_events_sharded_incomplete():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    window_start = int(time.time()) - 300
+
+    def scan_shard(hub_table, since, until):
+        # The middle shard runs out of time
+        completed = since == window_start or until > window_start + 250
+        return dict(
+            missing_events=[],
+            number_of_events=1,
+            oldest=since if completed else None,
+            completed=completed,
+        )
+
+    event_check = EventCheck(6, checkpoints=LocalCheckpoint())
+    with patch("shared.cfg.AutoConfigPlus.MIA_SCAN_SHARDS", 3), patch.object(
+        flask.g, "hub_table", MagicMock()
+    ), patch.object(
+        EventCheck, "get_time_h_hours_ago", return_value=window_start
+    ), patch.object(
+        EventCheck, "scan_shard", side_effect=scan_shard
+    ), patch.object(
+        EventCheck, "replay_missing_events", return_value=REPLAYED
+    ):
+        summary = event_check.retrieve_events("")
+
+    assert not summary["completed"]
+    assert 0.6 < summary["coverage"] < 0.7
+    # Only the oldest shard is verified along with everything before it
+    checkpoint = event_check.checkpoints.get_checkpoint(CHECKPOINT_NAME)
+    assert checkpoint["watermark"] == window_start + 100
+
+
+def test_retrieve_events_holds_checkpoint_after_failed_replay():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    event_check = EventCheck(6, checkpoints=LocalCheckpoint())
+    event_check.checkpoints.save_checkpoint(CHECKPOINT_NAME, watermark=5)
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {}
+    first_page = event_page(missing_event("evt_2", "cus_1", 20), has_more=True)
+    second_page = event_page(missing_event("evt_1", "cus_2", 10))
+    with patch.object(flask.g, "hub_table", hub_table), patch.object(
+        EventCheck, "get_events", return_value=first_page
+    ), patch.object(
+        EventCheck, "get_events_with_last_event", return_value=second_page
+    ), patch.object(
+        EventCheck,
+        "replay_missing_events",
+        side_effect=[dict(replayed=0, failed=1, failed_events=["evt_2"]), REPLAYED],
+    ):
+        summary = event_check.retrieve_events("")
+
+    # The whole window is scanned but the failed event is scanned again next run
+    assert summary["completed"]
+    assert summary["failed_replays"] == 1
+    assert event_check.checkpoints.get_checkpoint(CHECKPOINT_NAME) == dict(
+        watermark=5, cursor=None, scan_since=None, scan_until=None
+    )
+
+
+def test_retrieve_events_flushes_deliveries_before_checkpoint():
+    from hub.routes.batch import SalesforceBatch
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    checkpoints = LocalCheckpoint()
+    calls = MagicMock()
+    checkpoints.save_checkpoint = calls.save_checkpoint
+    hub_table = MagicMock()
+    hub_table.get_events.return_value = {}
+    first_page = event_page(missing_event("evt_3", "cus_1", 30), has_more=True)
+    second_page = event_page(missing_event("evt_2", "cus_1", 20), has_more=True)
+    with SalesforceBatch() as batch:
+
+        def flush():
+            calls.flush()
+            if calls.flush.call_count == 2:
+                # The second page's basket deliveries fail
+                batch.results["failed"] += 1
+            return []
+
+        with patch.object(batch, "flush", side_effect=flush), patch.object(
+            flask.g, "hub_table", hub_table
+        ), patch.object(
+            EventCheck, "get_events", return_value=first_page
+        ), patch.object(
+            EventCheck,
+            "get_events_with_last_event",
+            side_effect=[second_page, event_page()],
+        ), patch.object(
+            EventCheck, "replay_missing_events", return_value=REPLAYED
+        ):
+            summary = EventCheck(6, checkpoints=checkpoints).retrieve_events("")
+
+    assert summary["failed_deliveries"] == 1
+    assert [name for name, _, _ in calls.mock_calls] == [
+        "flush",
+        "save_checkpoint",
+        "flush",
+        "flush",
+    ]
+    assert calls.save_checkpoint.call_args[0][0] == CHECKPOINT_NAME
+    assert calls.save_checkpoint.call_args[1]["cursor"] == "evt_3"
+
+
+def test_retrieve_events_sharded_failed_replay():
+    from hub.verifications.events_check import EventCheck, CHECKPOINT_NAME
+    from shared.db import LocalCheckpoint
+
+    window_start = int(time.time()) - 300
+
+    def scan_shard(hub_table, since, until):
+        return dict(
+            missing_events=[missing_event(f"evt_{until}", "cus_1", until)],
+            number_of_events=1,
+            oldest=since,
+            completed=True,
+        )
+
+    def replay(missing_events):
+        # The replay of the middle shard's event fails
+        failed = [e["id"] for e in missing_events if e["created"] == window_start + 200]
+        return dict(replayed=2, failed=len(failed), failed_events=failed)
+
+    event_check = EventCheck(6, checkpoints=LocalCheckpoint())
+    with patch("shared.cfg.AutoConfigPlus.MIA_SCAN_SHARDS", 3), patch.object(
+        flask.g, "hub_table", MagicMock()
+    ), patch.object(
+        EventCheck, "get_time_h_hours_ago", return_value=window_start
+    ), patch.object(
+        EventCheck, "scan_shard", side_effect=scan_shard
+    ), patch.object(
+        EventCheck, "replay_missing_events", side_effect=replay
+    ):
+        summary = event_check.retrieve_events("")
+
+    assert summary["completed"]
+    assert summary["failed_replays"] == 1
+    checkpoint = event_check.checkpoints.get_checkpoint(CHECKPOINT_NAME)
+    assert checkpoint["watermark"] == window_start + 100
@@ -10,6 +10,7 @@ import time
 from stripe.util import convert_to_stripe_object
 from stripe.error import InvalidRequestError
 
+from hub.shared.vendor import stripe_call_counter
 from hub.vendor.invoices import (
     StripeInvoicePaymentFailed,
     StripeInvoicePaymentSucceeded,
@@ -179,3 +180,77 @@ class StripeInvoicePaymentSucceededTest(unittest.TestCase):
         did_run = StripeInvoicePaymentSucceeded(self.payment_succeeded_new_event).run()
 
         assert did_run
+
+    def test_subscription_data_recurring(self):
+        self.mock_invoice.return_value = self.invoice
+        self.mock_retrieve_invoice.return_value = self.invoice
+        self.mock_retrieve_charge.return_value = self.charge
+
+        data = StripeInvoicePaymentSucceeded(
+            self.payment_succeeded_new_event
+        ).get_subscription_data(
+            customer=self.subscription["customer"],
+            product_name="Project Guardian",
+            subscription=self.subscription,
+            event_type="customer.recurring_charge",
+        )
+
+        assert data["Next_Invoice_Date__c"] == self.invoice["period_end"]
+        assert data["proration_amount"] == self.invoice["amount_due"]
+        assert data["PMT_Transaction_ID__c"] == self.invoice["charge"]
+        self.mock_retrieve_charge.assert_called_once_with(self.invoice["charge"])
+        assert self.mock_invoice.call_count == 2
+
+    def test_subscription_data_created(self):
+        self.mock_invoice.return_value = self.invoice
+        self.mock_retrieve_invoice.return_value = self.invoice
+        self.mock_retrieve_charge.return_value = self.charge
+
+        data = StripeInvoicePaymentSucceeded(
+            self.payment_succeeded_new_event
+        ).get_subscription_data(
+            customer=self.subscription["customer"],
+            product_name="Project Guardian",
+            subscription=self.subscription,
+            event_type="customer.subscription.created",
+        )
+
+        assert "proration_amount" not in data
+        self.mock_invoice.assert_called_once()
+
+    def test_run_expands_subscription(self):
+        self.mock_subscription.return_value = self.subscription
+        self.mock_invoice.return_value = self.invoice
+        self.mock_retrieve_invoice.return_value = self.invoice
+        self.mock_retrieve_charge.return_value = self.charge
+
+        StripeInvoicePaymentSucceeded(self.payment_succeeded_new_event).run()
+
+        self.mock_subscription.assert_called_once_with(
+            id=self.payment_succeeded_new_event["data"]["object"]["subscription"],
+            expand=["customer", "latest_invoice.charge"],
+        )
+
+    def test_subscription_data_expanded(self):
+        self.mock_invoice.return_value = self.invoice
+        invoice = dict(self.invoice, charge=self.charge)
+        subscription = dict(self.subscription, latest_invoice=invoice)
+
+        with stripe_call_counter() as stripe_calls:
+            data = StripeInvoicePaymentSucceeded(
+                self.payment_succeeded_new_event
+            ).get_subscription_data(
+                customer=self.subscription["customer"],
+                product_name="Project Guardian",
+                subscription=subscription,
+                event_type="customer.recurring_charge",
+            )
+
+        assert data["PMT_Invoice_ID__c"] == self.invoice["id"]
+        assert data["PMT_Transaction_ID__c"] == self.charge["id"]
+        self.mock_retrieve_invoice.assert_not_called()
+        self.mock_retrieve_charge.assert_not_called()
+        assert stripe_calls == {
+            "retrieve_stripe_invoice_upcoming_by_subscription": 1,
+            "retrieve_stripe_invoice_upcoming": 1,
+        }
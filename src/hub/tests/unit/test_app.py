@@ -1,15 +1,19 @@
 # This Source Code Form is subject to the terms of the Mozilla Public
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
+import os
+import sys
 import json
+import subprocess  # nosec
 from unittest import TestCase
-from mock import patch
+from mock import MagicMock, patch
 
 from flask import jsonify
 from stripe.error import AuthenticationError, CardError, StripeError
+import hub
 from hub.shared.exceptions import SubHubError
 
-from hub.app import create_app
+from hub.app import create_app, provision_tables
 from hub.app import server_stripe_error
 from hub.app import intermittent_stripe_error
 from hub.app import server_stripe_error_with_params
@@ -27,6 +31,41 @@ def test_create_app():
     print(f"subhub error {dir(app)} app= {app}")
 
 
+def test_create_app_without_provisioning():
+    with patch("shared.cfg.AutoConfigPlus.HUB_PROVISION_TABLES", False), patch(
+        "hub.app.provision_tables"
+    ) as provision_tables:
+        app = create_app()
+    provision_tables.assert_not_called()
+    assert app.app.checkpoints.model.Meta.table_name == CFG.CHECKPOINT_TABLE
+
+
+def test_provision_tables():
+    existing, missing = MagicMock(), MagicMock()
+    existing.model.exists.return_value = True
+    missing.model.exists.return_value = False
+    provision_tables(dict(existing=existing, missing=missing))
+    existing.model.create_table.assert_not_called()
+    missing.model.create_table.assert_called_once_with(
+        read_capacity_units=1, write_capacity_units=1, wait=True
+    )
+
+
+def test_import_defers_optional_dependencies():
+    src = os.path.dirname(os.path.dirname(os.path.realpath(hub.__file__)))
+    lazy_modules = ("raven", "flask_cors", "pyinstrument", "boto3")
+    output = subprocess.check_output(  # nosec
+        [
+            sys.executable,
+            "-c",
+            f"import sys, hub.app; print([m for m in {lazy_modules!r} if m in sys.modules])",
+        ],
+        env=dict(os.environ, PYTHONPATH=src),
+        universal_newlines=True,
+    )
+    assert output.strip().splitlines()[-1] == "[]"
+
+
 def test_intermittent_stripe_error():
     expected = jsonify({"message": "something"}), 503
     error = StripeError("something")
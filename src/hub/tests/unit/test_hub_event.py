@@ -0,0 +1,24 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from flask import g
+
+
+def test_record_delivery(app):
+    # Runs against the DynamoDB Local table so the update expression and its
+    # condition on the sent_system list are checked by a real backend.
+    hub_table = g.hub_table
+    event_id = "evt_record_delivery"
+    hub_table.remove_from_db(event_id)
+
+    assert hub_table.record_delivery(event_id, "salesforce")
+    assert hub_table.get_event(event_id).sent_system == ["salesforce"]
+
+    assert not hub_table.record_delivery(event_id, "salesforce")
+    assert hub_table.get_event(event_id).sent_system == ["salesforce"]
+
+    assert hub_table.record_delivery(event_id, "fxa")
+    assert hub_table.get_event(event_id).sent_system == ["salesforce", "fxa"]
+
+    hub_table.remove_from_db(event_id)
@@ -0,0 +1,47 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from mock import patch
+
+from hub.vendor.controller import StripeHubEventPipeline
+from hub.vendor.customer import StripeCustomerCreated
+from hub.vendor.invoices import StripeInvoicePaymentSucceeded
+from hub.vendor.registry import EVENT_HANDLERS, StripeEventRegistry
+
+
+def test_handlers_are_registered():
+    assert EVENT_HANDLERS.get("customer.created") is StripeCustomerCreated
+    assert (
+        EVENT_HANDLERS.get("invoice.payment_succeeded") is StripeInvoicePaymentSucceeded
+    )
+    assert "payment_intent.succeeded" not in EVENT_HANDLERS
+
+
+def test_counters():
+    registry = StripeEventRegistry()
+    registry.register("customer.created")(StripeCustomerCreated)
+    registry.get("customer.created")
+    registry.get("customer.created")
+    registry.get("payment_intent.succeeded")
+    assert registry.accepts("customer.created")
+    assert not registry.accepts("payment_intent.succeeded")
+    assert registry.stats() == dict(
+        dispatched={"customer.created": 2},
+        unhandled={"payment_intent.succeeded": 2},
+    )
+
+
+def test_duplicate_registration():
+    registry = StripeEventRegistry()
+    registry.register("customer.created")(StripeCustomerCreated)
+    with pytest.raises(ValueError):
+        registry.register("customer.created")(StripeInvoicePaymentSucceeded)
+
+
+def test_unknown_event_type_is_not_converted():
+    with patch("hub.vendor.abstract.EventView") as event_view:
+        StripeHubEventPipeline({"id": "evt_1", "type": "charge.refunded"}).run()
+    event_view.assert_not_called()
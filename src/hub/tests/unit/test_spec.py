@@ -0,0 +1,66 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import shutil
+
+import pytest
+
+from connexion.spec import Swagger2Specification
+from openapi_spec_validator.exceptions import OpenAPIValidationError
+
+from hub.spec import (
+    SPEC_PATH,
+    build_spec_cache,
+    load_spec,
+    load_yaml_spec,
+    skip_spec_validation,
+)
+
+
+@pytest.fixture
+def spec_path(tmpdir):
+    path = str(tmpdir.join("swagger.yaml"))
+    shutil.copy(SPEC_PATH, path)
+    return path
+
+
+@pytest.fixture
+def cache_path(tmpdir):
+    return str(tmpdir.join("swagger.spec.json"))
+
+
+def test_load_spec_from_cache(spec_path, cache_path):
+    built = build_spec_cache(spec_path, cache_path)
+    spec, validated = load_spec(spec_path, cache_path)
+    assert validated
+    assert spec["paths"].keys() == built["paths"].keys()
+
+
+def test_load_spec_without_cache(spec_path, cache_path):
+    spec, validated = load_spec(spec_path, cache_path)
+    assert not validated
+    assert spec == load_yaml_spec(spec_path)
+
+
+def test_load_spec_stale_cache(spec_path, cache_path):
+    build_spec_cache(spec_path, cache_path)
+    with open(spec_path, "a") as f:
+        f.write("\n# changed\n")
+    _, validated = load_spec(spec_path, cache_path)
+    assert not validated
+
+
+def test_build_spec_cache_validates(spec_path, cache_path):
+    with open(spec_path, "a") as f:
+        f.write("unexpected: true\n")
+    with pytest.raises(OpenAPIValidationError):
+        build_spec_cache(spec_path, cache_path)
+
+
+def test_skip_spec_validation():
+    spec = {"swagger": "2.0", "info": {}, "paths": {}}
+    with skip_spec_validation():
+        Swagger2Specification(dict(spec))
+    with pytest.raises(Exception):
+        Swagger2Specification(dict(spec))
@@ -2,12 +2,19 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import hmac
+import json
+import time
 import flask
 
+from hashlib import sha256
 from flask import Response
+from mock import patch
 from mockito import unstub
 
 from hub.shared.tests.unit.utils import run_event_process
+from hub.vendor import controller
+from shared.cfg import CFG
 from shared.log import get_logger
 
 logger = get_logger()
@@ -47,3 +54,73 @@ def test_controller_view_bad_data(mocker):
     webhook = run_webhook(mocker, data)
     assert isinstance(webhook, Response)
     unstub()
+
+
+def post_webhook(body: bytes, secret: str) -> Response:
+    timestamp = int(time.time())
+    signed = f"{timestamp}.{body.decode('utf-8')}".encode("utf-8")
+    mac = hmac.new(secret.encode("utf-8"), msg=signed, digestmod=sha256)
+    headers = {"Stripe-Signature": f"t={timestamp},v1={mac.hexdigest()}"}
+    app = flask.Flask(__name__)
+    with app.test_request_context(
+        "/v1/hub", method="POST", data=body, headers=headers
+    ), patch.dict("os.environ", clear=False) as environ:
+        environ.pop("HUB_DOCKER", None)
+        return controller.view()
+
+
+def test_controller_view_signed_event_parsed_once():
+    event = {"id": "evt_1", "type": "customer.created", "data": {"object": {}}}
+    body = json.dumps(event).encode("utf-8")
+    with patch.object(controller, "StripeHubEventPipeline") as pipeline, patch(
+        "stripe.Webhook.construct_event"
+    ) as construct_event:
+        response = post_webhook(body, CFG.HUB_API_KEY)
+    assert response.status_code == 200
+    construct_event.assert_not_called()
+    payload = pipeline.call_args[0][0]
+    assert type(payload) is dict
+    assert payload == event
+
+
+def test_controller_view_bad_signature():
+    body = json.dumps({"id": "evt_1", "type": "customer.created"}).encode("utf-8")
+    with patch.object(controller, "StripeHubEventPipeline") as pipeline:
+        response = post_webhook(body, "not-the-key")
+    assert response.status_code == 400
+    pipeline.assert_not_called()
+
+
+def test_controller_view_async_queues_completed_event():
+    partial = {"id": "evt_1", "type": "customer.created"}
+    completed = dict(partial, data={"object": {"id": "cus_1"}})
+    app = flask.Flask(__name__)
+    with app.test_request_context(
+        "/v1/hub", method="POST", data=json.dumps(partial).encode("utf-8")
+    ), patch.dict("os.environ", {"HUB_DOCKER": "True"}), patch(
+        "shared.cfg.AutoConfigPlus.HUB_ASYNC_INGEST", True
+    ), patch.object(
+        controller, "EventMaker"
+    ) as event_maker, patch.object(
+        controller, "get_event_queue"
+    ) as get_event_queue, patch.object(
+        controller, "StripeHubEventPipeline"
+    ) as pipeline:
+        event_maker.return_value.get_complete_event.return_value = completed
+        response = controller.view()
+    assert response.status_code == 200
+    queued = get_event_queue.return_value.send.call_args[0][0]
+    assert json.loads(queued) == completed
+    pipeline.assert_not_called()
+
+
+def test_controller_view_counts_unhandled_type():
+    from hub.vendor.registry import EVENT_HANDLERS
+
+    event = {"id": "evt_1", "type": "payment_intent.created", "data": {"object": {}}}
+    before = EVENT_HANDLERS.stats()["unhandled"].get("payment_intent.created", 0)
+    with patch.object(controller, "StripeHubEventPipeline") as pipeline:
+        response = post_webhook(json.dumps(event).encode("utf-8"), CFG.HUB_API_KEY)
+    assert response.status_code == 200
+    pipeline.assert_not_called()
+    assert EVENT_HANDLERS.stats()["unhandled"]["payment_intent.created"] == before + 1
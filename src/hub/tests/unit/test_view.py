@@ -0,0 +1,78 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+
+import pytest
+
+from hub.vendor.view import EventView, generate_fields
+from shared.log import render_mappings
+
+EVENT = {
+    "id": "evt_1",
+    "type": "invoice.payment_succeeded",
+    "data": {
+        "object": {
+            "customer": "cus_1",
+            "metadata": {"userid": "user_1"},
+            "lines": {"data": [{"plan": {"product": "prod_1"}}]},
+        }
+    },
+}
+
+
+def test_attribute_access():
+    view = EventView(EVENT)
+    assert view.id == "evt_1"
+    assert view.data.object.customer == "cus_1"
+    assert view.data.object.metadata.get("userid") == "user_1"
+    assert view.data.object.lines.data[0].plan.product == "prod_1"
+    with pytest.raises(AttributeError):
+        view.data.object.subscription
+
+
+def test_item_access_returns_raw_values():
+    view = EventView(EVENT)
+    assert view["type"] == "invoice.payment_succeeded"
+    assert view.data.object["metadata"] is EVENT["data"]["object"]["metadata"]
+    assert view.data.object.get("lines") is EVENT["data"]["object"]["lines"]
+    assert view.get("missing", "default") == "default"
+    assert "data" in view and "missing" not in view
+    assert json.dumps(dict(view)) == json.dumps(EVENT)
+
+
+def test_view_does_not_copy():
+    event = {"data": {"object": {"status": "active"}}}
+    view = EventView(event)
+    event["data"]["object"]["status"] = "canceled"
+    assert view.data.object.status == "canceled"
+    assert view.to_dict() is event
+    assert view == event
+
+
+def test_view_is_read_only():
+    view = EventView(EVENT)
+    with pytest.raises(AttributeError):
+        view.id = "evt_2"
+    with pytest.raises(TypeError):
+        view["id"] = "evt_2"
+
+
+def test_views_are_logged_as_dicts():
+    event_dict = render_mappings(None, "info", dict(payload=EventView(EVENT)))
+    assert type(event_dict["payload"]) is dict
+    assert event_dict["payload"] == EVENT
+
+
+def test_generated_fields():
+    assert isinstance(EventView.__dict__["customer"], property)
+    assert "discount" not in EventView.__dict__
+    view = EventView({"data": {"object": {"discount": None, "customer": "cus_1"}}})
+    assert view.data.object.discount is None
+    assert view.data.object.customer == "cus_1"
+
+
+def test_generated_field_cannot_shadow_mapping():
+    with pytest.raises(ValueError):
+        generate_fields(EventView, ["items"])
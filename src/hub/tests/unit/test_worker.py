@@ -0,0 +1,81 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+
+import pytest
+
+from mock import MagicMock, patch
+
+from hub.vendor.worker import EventQueueWorker, process_records
+from hub.shared.event_queue import SqliteEventQueue
+
+
+def test_drain_runs_pipeline_and_deletes():
+    queue = SqliteEventQueue(":memory:")
+    queue.send(json.dumps({"id": "evt_1", "type": "customer.created"}))
+    queue.send(json.dumps({"id": "evt_2", "type": "customer.created"}))
+    with patch("hub.vendor.worker.StripeHubEventPipeline") as pipeline:
+        processed = EventQueueWorker(queue, batch_size=1).drain()
+    assert processed == 2
+    assert pipeline.call_count == 2
+    assert len(queue) == 0
+
+
+def test_drain_keeps_failed_events():
+    queue = SqliteEventQueue(":memory:")
+    queue.send(json.dumps({"id": "evt_1", "type": "customer.created"}))
+    with patch("hub.vendor.worker.StripeHubEventPipeline") as pipeline:
+        pipeline.return_value.run.side_effect = Exception("basket down")
+        processed = EventQueueWorker(queue, batch_size=10).drain()
+    assert processed == 0
+    assert len(queue) == 1
+
+
+def test_drain_respects_max_messages():
+    queue = SqliteEventQueue(":memory:")
+    for i in range(3):
+        queue.send(json.dumps({"id": f"evt_{i}", "type": "customer.created"}))
+    with patch("hub.vendor.worker.StripeHubEventPipeline"):
+        processed = EventQueueWorker(queue, batch_size=10).drain(max_messages=2)
+    assert processed == 2
+    assert len(queue) == 1
+
+
+def test_process_records_deletes_succeeded_before_raising():
+    records = [
+        {"messageId": f"m{i}", "receiptHandle": f"r{i}", "body": json.dumps({"n": i})}
+        for i in range(3)
+    ]
+
+    def run(payload):
+        if payload["n"] == 1:
+            raise Exception("basket down")
+        return MagicMock()
+
+    with patch("hub.vendor.worker.get_app"), patch(
+        "hub.vendor.worker.current_app"
+    ), patch("hub.vendor.worker.g"), patch(
+        "hub.vendor.worker.StripeHubEventPipeline", side_effect=run
+    ), patch(
+        "hub.vendor.worker.get_event_queue"
+    ) as get_event_queue:
+        with pytest.raises(Exception, match="basket down"):
+            process_records(records)
+    deleted = [c[0][0] for c in get_event_queue.return_value.delete.call_args_list]
+    assert deleted == ["r0", "r2"]
+
+
+def test_process_records_all_succeeded():
+    records = [{"messageId": "m0", "receiptHandle": "r0", "body": "{}"}]
+    with patch("hub.vendor.worker.get_app"), patch(
+        "hub.vendor.worker.current_app"
+    ), patch("hub.vendor.worker.g"), patch(
+        "hub.vendor.worker.StripeHubEventPipeline"
+    ) as pipeline, patch(
+        "hub.vendor.worker.get_event_queue"
+    ) as get_event_queue:
+        process_records(records)
+    pipeline.assert_called_once_with({})
+    get_event_queue.assert_not_called()
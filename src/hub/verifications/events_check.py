@@ -2,16 +2,23 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 import sys
+import json
 import time
 import stripe
+import contextvars
 
 from abc import ABC
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from flask import current_app
 
 from hub.app import create_app, g
+from hub.routes.batch import ACTIVE_BATCH, ORDERING_KEY, SalesforceBatch
+from hub.shared.vendor import get_stripe_rate_limiter
 from hub.vendor.controller import event_process
+from shared.aws import get_client
 from shared.cfg import CFG
 from shared.log import get_logger
 
@@ -28,58 +35,503 @@ else:
     app = create_app()
 
 
+# Name of the reconciler's checkpoint in the checkpoint table
+CHECKPOINT_NAME = "mia"
+# Key of the re-invocation count in the payload of a self re-invocation
+REINVOCATIONS_KEY = "mia_reinvocations"
+# Largest share of the invocation's remaining time kept as the deadline margin
+DEADLINE_MARGIN_SHARE = 0.25
+
+
+def deadline_from_context(context: Any) -> Optional[float]:
+    """
+    time.monotonic() value at which the Lambda invocation times out
+    :param context: Lambda context object, or None outside Lambda
+    :return: deadline, None when there is no context
+    """
+    if context is None:
+        return None
+    return time.monotonic() + context.get_remaining_time_in_millis() / 1000
+
+
 class EventCheck(ABC):
-    def __init__(self, hours_back) -> None:
+    def __init__(self, hours_back, checkpoints=None, deadline=None) -> None:
         self.hours_back = hours_back
+        self.checkpoints = checkpoints
+        self.deadline = deadline
+        self.margin = 0.0
+        if deadline is not None:
+            # A short Lambda timeout must not leave the scan no time at all
+            remaining = max(0.0, deadline - time.monotonic())
+            self.margin = min(
+                CFG.MIA_DEADLINE_MARGIN, remaining * DEADLINE_MARGIN_SHARE
+            )
 
-    def retrieve_events(self, last_event=str()) -> None:
+    def retrieve_events(self, last_event=str()) -> Dict[str, Any]:
+        """
+        Verify the events in the window against the hub table and replay the
+        missing ones, a page at a time.  With a checkpoint store the scan
+        resumes an interrupted run from its cursor, or otherwise only covers
+        events newer than the watermark less MIA_CHECKPOINT_OVERLAP seconds.
+        With a deadline, paging stops MIA_DEADLINE_MARGIN seconds before it,
+        or a quarter of the remaining time if that is less, leaving the
+        cursor in the checkpoint for the next run.  Once a replay or its
+        delivery fails the checkpoint is left where it was, so the next run
+        scans the failed events again.  A fresh scan is split across
+        MIA_SCAN_SHARDS sub-windows when that is above one.
+        :param last_event: id of the event to start after
+        :return: summary of the scan
+        """
+        since, until, last_event, watermark = self.resume_scan(last_event)
+        if CFG.MIA_SCAN_SHARDS > 1 and not last_event:
+            return self.retrieve_events_sharded(since, watermark, CFG.MIA_SCAN_SHARDS)
+        start = time.perf_counter()
         retrieved_events = 0
+        missing_events = 0
+        oldest = None
+        failed_replays = 0
+        failed_deliveries = 0
+        completed = True
         has_more = True
         while has_more:
+            if self.out_of_time():
+                logger.warning("event check out of time", last_event=last_event)
+                completed = False
+                break
             if not last_event:
-                events = self.get_events()
+                events = self.get_events(since)
             else:
-                events = self.get_events_with_last_event(last_event)
-            for e in events.data:  # type: ignore
-                existing_event = g.hub_table.get_event(e["id"])
-                if not existing_event:
-                    logger.info("is existing event", is_event=existing_event)
-                    self.process_missing_event(e)
+                events = self.get_events_with_last_event(last_event, since)
+            if events.data and until is None:  # type: ignore
+                # Stripe lists newest first, so this bounds the whole scan
+                until = events.data[0]["created"]  # type: ignore
+            page_missing_events = self.find_missing_events(
+                g.hub_table, events.data  # type: ignore
+            )
+            # Replay and deliver before moving the cursor so it only passes
+            # verified events
+            replay = self.replay_missing_events(page_missing_events)
+            failed_replays += replay["failed"]
+            failed_deliveries = self.flush_deliveries()
             retrieved_events += len(events.data)  # type: ignore
+            missing_events += len(page_missing_events)
+            if events.data:  # type: ignore
+                oldest = events.data[-1]["created"]  # type: ignore
 
             has_more = events.has_more  # type: ignore
             if has_more:
                 last_event = events.data[-1]["id"]  # type: ignore
+                if not failed_replays and not failed_deliveries:
+                    self.save_checkpoint(
+                        watermark=watermark,
+                        cursor=last_event,
+                        scan_since=since,
+                        scan_until=until,
+                    )
             logger.info("last_event", last_event=last_event)
-        logger.info("number events", number_of_events=retrieved_events)
+        if failed_replays or failed_deliveries:
+            logger.warning(
+                "event check checkpoint held back",
+                failed_replays=failed_replays,
+                failed_deliveries=failed_deliveries,
+            )
+        elif completed:
+            if until is not None:
+                watermark = max(until, watermark or 0)
+            self.save_checkpoint(watermark=watermark)
+        elapsed = time.perf_counter() - start
+        summary = dict(
+            number_of_events=retrieved_events,
+            missing_events=missing_events,
+            failed_replays=failed_replays,
+            failed_deliveries=failed_deliveries,
+            completed=completed,
+            coverage=self.coverage(since, until, oldest, completed),
+            seconds=round(elapsed, 3),
+            events_per_second=round(retrieved_events / elapsed, 2) if elapsed else 0,
+            since=since,
+            watermark=watermark,
+        )
+        logger.info("number events", **summary)
+        return summary
+
+    def retrieve_events_sharded(
+        self, since: int, watermark: Any, shards: int
+    ) -> Dict[str, Any]:
+        """
+        Split the window from since to now into equal `created` sub-windows
+        and page them concurrently, within the Stripe rate-limit budget.  The
+        missing events of every shard are merged and replayed together.  A
+        shard is verified once it was scanned to the end and none of its
+        replays failed.  The watermark moves up to the newest verified shard
+        whose older shards are all verified too, so a scan cut short is
+        picked up there next time.  It stays put when a delivery fails, as
+        those cannot be traced back to a shard.
+        :param since:
+        :param watermark:
+        :param shards: number of sub-windows
+        :return: summary of the scan
+        """
+        start = time.perf_counter()
+        now = int(time.time())
+        bounds = [
+            since + (now - since) * index // shards for index in range(shards + 1)
+        ]
+        windows = list(zip(bounds, bounds[1:]))
+        hub_table = g.hub_table
+        with ThreadPoolExecutor(
+            max_workers=shards, thread_name_prefix="mia-scan"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, self.scan_shard, hub_table, *window
+                )
+                for window in windows
+            ]
+            results = [future.result() for future in futures]
 
-    def get_events(self) -> Dict[str, Any]:
+        missing_events: Dict[str, Dict[str, Any]] = OrderedDict()
+        for result in results:
+            for event in result["missing_events"]:
+                missing_events.setdefault(event["id"], event)
+        replay = self.replay_missing_events(list(missing_events.values()))
+        failed_deliveries = self.flush_deliveries()
+        failed_created = [
+            missing_events[event_id]["created"] for event_id in replay["failed_events"]
+        ]
+
+        verified_until = None
+        covered = 0
+        for (shard_since, shard_until), result in zip(windows, results):
+            if result["completed"]:
+                covered += shard_until - shard_since
+            elif result["oldest"] is not None:
+                covered += shard_until - result["oldest"]
+        for (shard_since, shard_until), result in zip(windows, results):
+            if (
+                not result["completed"]
+                or failed_deliveries
+                or any(
+                    shard_since < created <= shard_until for created in failed_created
+                )
+            ):
+                break
+            verified_until = shard_until
+        if verified_until is not None:
+            watermark = max(verified_until, watermark or 0)
+            self.save_checkpoint(watermark=watermark)
+
+        retrieved_events = sum(result["number_of_events"] for result in results)
+        elapsed = time.perf_counter() - start
+        summary = dict(
+            number_of_events=retrieved_events,
+            missing_events=len(missing_events),
+            failed_replays=replay["failed"],
+            failed_deliveries=failed_deliveries,
+            completed=all(result["completed"] for result in results),
+            coverage=round(covered / (now - since), 3) if now > since else 1.0,
+            seconds=round(elapsed, 3),
+            events_per_second=round(retrieved_events / elapsed, 2) if elapsed else 0,
+            since=since,
+            watermark=watermark,
+            shards=shards,
+        )
+        logger.info("number events", **summary)
+        return summary
+
+    def scan_shard(self, hub_table, since: int, until: int) -> Dict[str, Any]:
+        """
+        Page through the events created after since and up to until
+        :return: the missing events, number of events, created timestamp of
+            the oldest event seen and whether the shard was scanned to the end
+        """
+        missing_events: List[Dict[str, Any]] = []
+        retrieved_events = 0
+        oldest = None
+        last_event = ""
+        completed = True
+        has_more = True
+        while has_more:
+            if self.out_of_time():
+                completed = False
+                break
+            if not last_event:
+                events = self.get_events(since, until)
+            else:
+                events = self.get_events_with_last_event(last_event, since, until)
+            missing_events += self.find_missing_events(
+                hub_table, events.data  # type: ignore
+            )
+            retrieved_events += len(events.data)  # type: ignore
+            if events.data:  # type: ignore
+                oldest = events.data[-1]["created"]  # type: ignore
+            has_more = events.has_more  # type: ignore
+            if has_more:
+                last_event = events.data[-1]["id"]  # type: ignore
+        logger.debug(
+            "event shard scanned",
+            since=since,
+            until=until,
+            number_of_events=retrieved_events,
+            completed=completed,
+        )
+        return dict(
+            missing_events=missing_events,
+            number_of_events=retrieved_events,
+            oldest=oldest,
+            completed=completed,
+        )
+
+    @staticmethod
+    def find_missing_events(
+        hub_table, events: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        existing_events = hub_table.get_events([e["id"] for e in events])
+        missing_events = []
+        for e in events:
+            if e["id"] not in existing_events:
+                logger.info("missing event", event_id=e["id"])
+                missing_events.append(e)
+        return missing_events
+
+    @staticmethod
+    def flush_deliveries() -> int:
+        """
+        Deliver the route messages replays have queued on the active
+        SalesforceBatch
+        :return: number of the batch's deliveries that have failed so far
+        """
+        batch = ACTIVE_BATCH.get()
+        if batch is None:
+            return 0
+        batch.flush()
+        return batch.results["failed"]
+
+    def out_of_time(self) -> bool:
+        if self.deadline is None:
+            return False
+        return time.monotonic() >= self.deadline - self.margin
+
+    @staticmethod
+    def coverage(
+        since: int, until: Optional[int], oldest: Optional[int], completed: bool
+    ) -> float:
+        """
+        Fraction of the scanned window, from since to the newest event, that
+        has been verified; paging runs from the newest event backwards
+        """
+        if completed:
+            return 1.0
+        if until is None or oldest is None or until <= since:
+            return 0.0
+        return round(min(1.0, (until - oldest) / (until - since)), 3)
+
+    def resume_scan(self, last_event: str) -> Tuple[int, Optional[int], str, Any]:
+        """
+        Work out where this run's scan starts from the stored checkpoint
+        :param last_event:
+        :return: created lower bound, newest created of the scan if resuming,
+            event id to start after and the current watermark
+        """
+        window_start = self.get_time_h_hours_ago(self.hours_back)
+        checkpoint = self.load_checkpoint() or {}
+        watermark = checkpoint.get("watermark")
+        scan_since = checkpoint.get("scan_since")
+        if (
+            not last_event
+            and checkpoint.get("cursor")
+            and scan_since is not None
+            and scan_since >= window_start
+        ):
+            logger.info("resuming event scan", checkpoint=checkpoint)
+            return (
+                int(scan_since),
+                checkpoint.get("scan_until"),
+                checkpoint["cursor"],
+                watermark,
+            )
+        since = window_start
+        if watermark is not None:
+            since = max(window_start, int(watermark) - CFG.MIA_CHECKPOINT_OVERLAP)
+        return since, None, last_event, watermark
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if self.checkpoints is None:
+            return None
+        return self.checkpoints.get_checkpoint(CHECKPOINT_NAME)
+
+    def save_checkpoint(self, **fields: Any) -> None:
+        if self.checkpoints is not None:
+            self.checkpoints.save_checkpoint(CHECKPOINT_NAME, **fields)
+
+    def get_events(
+        self, since: Optional[int] = None, until: Optional[int] = None
+    ) -> Dict[str, Any]:
+        get_stripe_rate_limiter().acquire()
         return stripe.Event.list(
             limit=100,
             types=CFG.PAYMENT_EVENT_LIST,
-            created={"gt": self.get_time_h_hours_ago(self.hours_back)},
+            created=self.created_range(since, until),
         )
 
-    def get_events_with_last_event(self, last_event) -> Dict[str, Any]:
+    def get_events_with_last_event(
+        self, last_event, since: Optional[int] = None, until: Optional[int] = None
+    ) -> Dict[str, Any]:
+        get_stripe_rate_limiter().acquire()
         return stripe.Event.list(
             limit=100,
             types=CFG.PAYMENT_EVENT_LIST,
-            created={"gt": self.get_time_h_hours_ago(self.hours_back)},
+            created=self.created_range(since, until),
             starting_after=last_event,
         )
 
+    def created_range(self, since: Optional[int], until: Optional[int]) -> Dict:
+        if since is None:
+            since = self.get_time_h_hours_ago(self.hours_back)
+        if until is None:
+            return {"gt": since}
+        return {"gt": since, "lte": until}
+
     @staticmethod
     def get_time_h_hours_ago(hours_back: int) -> int:
         h_hours_ago = datetime.now() - timedelta(hours=hours_back)
         return int(time.mktime(h_hours_ago.timetuple()))
 
     @staticmethod
-    def process_missing_event(missing_event) -> None:
-        event_process(missing_event)
+    def process_missing_event(missing_event) -> Any:
+        return event_process(missing_event)
+
+    @staticmethod
+    def customer_key(event: Dict[str, Any]) -> str:
+        """
+        Ordering key for replay: the Stripe customer the event belongs to, or
+        the event id when it has none
+        """
+        data_object = event["data"]["object"]
+        if data_object.get("object") == "customer":
+            return data_object.get("id")
+        customer = data_object.get("customer")
+        if isinstance(customer, dict):
+            customer = customer.get("id")
+        return customer or event["id"]
+
+    def replay_missing_events(
+        self, missing_events: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Replay missing events on a bounded pool of MIA_REPLAY_WORKERS threads.
+        Events of one customer run serially, oldest first, while different
+        customers are replayed in parallel.
+        :param missing_events:
+        :return: summary of the replay, with the ids of the events that failed
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = OrderedDict()
+        for event in missing_events:
+            groups.setdefault(self.customer_key(event), []).append(event)
+        start = time.perf_counter()
+        failed_events: List[str] = []
+        if groups:
+            flask_app = current_app._get_current_object()
+            tables = dict(
+                hub_table=g.hub_table,
+                subhub_deleted_users=g.get("subhub_deleted_users"),
+            )
+            workers = min(CFG.MIA_REPLAY_WORKERS, len(groups))
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="mia"
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self.replay_customer_events,
+                        flask_app,
+                        tables,
+                        sorted(events, key=lambda event: event["created"]),
+                    )
+                    for events in groups.values()
+                ]
+                for future in futures:
+                    failed_events += future.result()
+        elapsed = time.perf_counter() - start
+        summary = dict(
+            replayed=len(missing_events) - len(failed_events),
+            failed=len(failed_events),
+            customers=len(groups),
+            seconds=round(elapsed, 3),
+            events_per_second=round(len(missing_events) / elapsed, 2) if elapsed else 0,
+        )
+        logger.info("missing events replayed", **summary)
+        return dict(summary, failed_events=failed_events)
+
+    def replay_customer_events(
+        self, flask_app, tables: Dict[str, Any], events: List[Dict[str, Any]]
+    ) -> List[str]:
+        """
+        Replay one customer's events in order inside a fresh app context that
+        shares the caller's tables.  Their route messages are queued under the
+        customer's ordering key so a SalesforceBatch posts them in order.
+        :return ids of the events that failed:
+        """
+        failed: List[str] = []
+        token = ORDERING_KEY.set(self.customer_key(events[0]))
+        try:
+            with flask_app.app_context():
+                for name, table in tables.items():
+                    setattr(g, name, table)
+                for event in events:
+                    try:
+                        response = self.process_missing_event(event)
+                        if response.status_code >= 400:
+                            failed.append(event["id"])
+                    except Exception as e:  # pylint: disable=broad-except
+                        logger.error("replay error", event_id=event["id"], error=e)
+                        failed.append(event["id"])
+        finally:
+            ORDERING_KEY.reset(token)
+        return failed
+
 
+def reinvoke(context: Any, reinvocations: int) -> bool:
+    """
+    Invoke this Lambda again asynchronously so it carries on from the saved
+    cursor, at most MIA_MAX_REINVOCATIONS times in a row
+    :param context: Lambda context object
+    :param reinvocations: re-invocations that led to this run
+    :return: True if invoked
+    """
+    if reinvocations >= CFG.MIA_MAX_REINVOCATIONS:
+        logger.warning("event check not reinvoked", reinvocations=reinvocations)
+        return False
+    get_client("lambda", region_name=CFG.AWS_REGION).invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps({REINVOCATIONS_KEY: reinvocations + 1}),
+    )
+    logger.info("event check reinvoked", reinvocations=reinvocations + 1)
+    return True
 
-def process_events(hours_back: int) -> None:
+
+def process_events(
+    hours_back: int, context: Any = None, reinvocations: int = 0
+) -> Dict[str, Any]:
+    """
+    Check the last hours_back hours of Stripe events for ones the hub missed
+    :param hours_back:
+    :param context: Lambda context, bounds the run by its remaining time
+    :param reinvocations: re-invocations that led to this run
+    :return: summary of the scan
+    """
     with app.app.app_context():
         g.hub_table = current_app.hub_table
-        event_check = EventCheck(hours_back)
-        event_check.retrieve_events("")
+        g.subhub_deleted_users = current_app.subhub_deleted_users
+        event_check = EventCheck(
+            hours_back,
+            checkpoints=current_app.checkpoints,
+            deadline=deadline_from_context(context),
+        )
+        # Replayed events arrive in bursts; deliver their route messages in batches
+        with SalesforceBatch():
+            summary = event_check.retrieve_events("")
+    if not summary["completed"] and context is not None:
+        reinvoke(context, reinvocations)
+    return summary
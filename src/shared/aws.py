@@ -0,0 +1,45 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import threading
+
+from typing import Any, Dict, Tuple
+
+from shared.cfg import CFG
+from shared.log import get_logger
+
+logger = get_logger()
+
+CLIENTS: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], Any] = {}
+CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(service_name: str, **kwargs: Any) -> Any:
+    """
+    Process-wide boto3 client for service_name.  Building a client loads the
+    service model and resolves credentials, so one client per service and
+    arguments is created lazily and reused across warm invocations.  boto3
+    clients are thread safe once created; creation is serialised here.
+    AWS_ENDPOINT_URL points every client at a local stub such as localstack.
+    :param service_name:
+    :param kwargs: passed to boto3.client, e.g. region_name
+    :return: boto3 client
+    """
+    if CFG.AWS_ENDPOINT_URL and "endpoint_url" not in kwargs:
+        kwargs["endpoint_url"] = CFG.AWS_ENDPOINT_URL
+    key = (service_name, tuple(sorted(kwargs.items())))
+    with CLIENTS_LOCK:
+        client = CLIENTS.get(key)
+        if client is None:
+            import boto3  # only loaded by processes that talk to AWS directly
+
+            client = boto3.client(service_name=service_name, **kwargs)
+            CLIENTS[key] = client
+            logger.debug("aws client created", service_name=service_name)
+    return client
+
+
+def clear_clients() -> None:
+    with CLIENTS_LOCK:
+        CLIENTS.clear()
@@ -0,0 +1,65 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+
+from typing import Any, Dict, Optional
+
+from shared.cfg import CFG
+from shared.log import get_logger
+
+logger = get_logger()
+
+BUILD_INFO_FIELDS = (
+    "BRANCH",
+    "VERSION",
+    "REVISION",
+    "DEPLOYED_BY",
+    "DEPLOYED_ENV",
+    "DEPLOYED_WHEN",
+)
+BUILD_INFO: Optional[Dict[str, Any]] = None
+
+BUILD_INFO_TEMPLATE = """\
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+# Generated by `doit build_info`, do not edit
+
+BUILD_INFO = {build_info}
+"""
+
+
+def get_build_info() -> Dict[str, Any]:
+    """
+    Build metadata baked into the package by `doit build_info`, or read from
+    CFG once when running from a source checkout
+    :return: BUILD_INFO_FIELDS and their values
+    """
+    global BUILD_INFO
+    if BUILD_INFO is None:
+        try:
+            from shared.build_info import BUILD_INFO as build_info
+        except ImportError:
+            logger.debug("no generated build info, using config")
+            build_info = {field: getattr(CFG, field) for field in BUILD_INFO_FIELDS}
+        BUILD_INFO = build_info
+    return BUILD_INFO
+
+
+def write_build_info(path: str) -> Dict[str, Any]:
+    """
+    Write the generated shared.build_info module for the package
+    :param path: file to write
+    :return: the build info written
+    """
+    build_info = {field: getattr(CFG, field) for field in BUILD_INFO_FIELDS}
+    with open(path, "w") as f:
+        f.write(
+            BUILD_INFO_TEMPLATE.format(
+                build_info=json.dumps(build_info, indent=4, sort_keys=True)
+            )
+        )
+    return build_info
@@ -80,12 +80,44 @@ def git(args, strip=True, **kwargs):
         raise ex
 
 
+class setting(property):  # pylint: disable=invalid-name
+    """
+    Read-only property of AutoConfigPlus whose value is resolved on first
+    access and then served from the config's values dict, so environment
+    parsing and git subprocesses happen once rather than on every read.
+    AutoConfigPlus.reload() discards the resolved values.
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        values = instance.values
+        name = self.fget.__name__
+        try:
+            return values[name]
+        except KeyError:
+            value = values[name] = self.fget(instance)
+            return value
+
+
 class AutoConfigPlus(AutoConfig):  # pylint: disable=too-many-public-methods
-    @property
+    def __init__(self, search_path=None):
+        super().__init__(search_path)
+        self.values = {}
+
+    def reload(self):
+        """
+        Forget every resolved value so the next access reads the environment
+        again, e.g. once secrets have been loaded into it
+        """
+        self.values.clear()
+        logger.debug("config reloaded")
+
+    @setting
     def REPO_ROOT(self):
         return git("rev-parse --show-toplevel")
 
-    @property
+    @setting
     def LOG_LEVEL(self):
         default_level = {
             "prod": "WARNING",
@@ -96,21 +128,49 @@ class AutoConfigPlus(AutoConfig):  # pylint: disable=too-many-public-methods
         }.get(self.DEPLOYED_ENV, "NOTSET")
         return self("LOG_LEVEL", default_level)
 
-    @property
+    @setting
+    def LOG_MAX_FIELD_SIZE(self):
+        return self("LOG_MAX_FIELD_SIZE", 4096, cast=int)
+
+    @setting
+    def LOG_INFO_SAMPLE_RATE(self):
+        return self("LOG_INFO_SAMPLE_RATE", 1, cast=int)
+
+    @setting
+    def LOG_CENSOR_FIELDS(self):
+        return self(
+            "LOG_CENSOR_FIELDS",
+            "email,Email,last4,Last_4_Digits__c,"
+            "data.object.email,data.object.customer_email,data.object.last4",
+        )
+
+    @setting
+    def LOG_ASYNC(self):
+        return self("LOG_ASYNC", default=False, cast=bool)
+
+    @setting
+    def LOG_QUEUE_SIZE(self):
+        return self("LOG_QUEUE_SIZE", 10000, cast=int)
+
+    @setting
+    def LOG_QUEUE_OVERFLOW(self):
+        return self("LOG_QUEUE_OVERFLOW", "drop")
+
+    @setting
     def VERSION(self):
         try:
             return git("describe --abbrev=7 --always")
         except (NotGitRepoError, GitCommandNotFoundError):
             return self("VERSION")
 
-    @property
+    @setting
     def BRANCH(self):
         try:
             return git("rev-parse --abbrev-ref HEAD")
         except (NotGitRepoError, GitCommandNotFoundError):
             return self("BRANCH")
 
-    @property
+    @setting
     def DEPLOYED_ENV(self):
         deployed_env = self("DEPLOYED_ENV", None)
         if deployed_env:
@@ -124,7 +184,7 @@ class AutoConfigPlus(AutoConfig):  # pylint: disable=too-many-public-methods
             return "qa"
         return "dev"
 
-    @property
+    @setting
     def DEPLOYED_BY(self):
         return self("DEPLOYED_BY", f"{self.USER}@{self.HOSTNAME}")
 
@@ -133,35 +193,35 @@ class AutoConfigPlus(AutoConfig):  # pylint: disable=too-many-public-methods
     def DEPLOYED_WHEN(self):
         return self("DEPLOYED_WHEN", datetime.utcnow().isoformat())
 
-    @property
+    @setting
     def REVISION(self):
         try:
             return git("rev-parse HEAD")
         except (NotGitRepoError, GitCommandNotFoundError):
             return self("REVISION")
 
-    @property
+    @setting
     def REMOTE_ORIGIN_URL(self):
         try:
             return git("config --get remote.origin.url")
         except (NotGitRepoError, GitCommandNotFoundError):
             return self("REMOTE_ORIGIN_URL")
 
-    @property
+    @setting
     def REPO_NAME(self):
         pattern = r"^((https|ssh)://)?(git@)?github.com[:/](?P<repo_name>[A-Za-z0-9\/\-_]+)(.git)?$"
         match = re.search(pattern, self.REMOTE_ORIGIN_URL)
         return match.group("repo_name")
 
-    @property
+    @setting
     def PROJECT_NAME(self):
         return os.path.basename(self.REPO_NAME)
 
-    @property
+    @setting
     def PROJECT_PATH(self):
         return os.path.join(self.REPO_ROOT, self.PROJECT_NAME)
 
-    @property
+    @setting
     def LS_REMOTE(self):
         repo_name = self.REPO_NAME
         logger.info(f"repo_name={repo_name}")
@@ -171,157 +231,261 @@ class AutoConfigPlus(AutoConfig):  # pylint: disable=too-many-public-methods
             for revision, refname in [line.split() for line in result.split("\n")]
         }
 
-    @property
+    @setting
     def DELETED_USER_TABLE(self):
         return self("DELETED_USER_TABLE", f"deleted-users-{CFG.DEPLOYED_ENV}")
 
-    @property
+    @setting
     def EVENT_TABLE(self):
         return self("EVENT_TABLE", f"events-{CFG.DEPLOYED_ENV}")
 
-    @property
+    @setting
+    def CHECKPOINT_TABLE(self):
+        return self("CHECKPOINT_TABLE", f"checkpoints-{CFG.DEPLOYED_ENV}")
+
+    @setting
     def STRIPE_REQUEST_TIMEOUT(self):
         return self("STRIPE_REQUEST_TIMEOUT", 9, cast=int)
 
-    @property
+    @setting
     def STRIPE_MOCK_HOST(self):
         return self("STRIPE_MOCK_HOST", "stripe")
 
-    @property
+    @setting
     def STRIPE_MOCK_PORT(self):
         return self("STRIPE_MOCK_PORT", 12112, cast=int)
 
-    @property
+    @setting
     def STRIPE_LOCAL(self):
         return self("STRIPE_LOCAL", default=False, cast=bool)
 
-    @property
+    @setting
     def HUB_LOCAL(self):
         return self("HUB_LOCAL", default=False, cast=bool)
 
-    @property
+    @setting
     def STRIPE_API_KEY(self):
         return self("STRIPE_API_KEY", "sk_test_123")
 
-    @property
+    @setting
     def LOCAL_FLASK_PORT(self):
         return self("LOCAL_FLASK_PORT", 5000, cast=int)
 
-    @property
+    @setting
     def LOCAL_HUB_FLASK_PORT(self):
         return self("LOCAL_HUB_FLASK_PORT", 5001, cast=int)
 
-    @property
+    @setting
     def DYNALITE_URL(self):
         """
         dynalite url
         """
         return self("DYNALITE_URL", "http://127.0.0.1:8000")
 
-    @property
+    @setting
     def DYNALITE_PORT(self):
         return self("DYNALITE_PORT", 8000, cast=int)
 
-    @property
+    @setting
     def SALESFORCE_BASKET_URI(self):
         return self("SALESFORCE_BASKET_URI", "http://www.example.com?api-key=")
 
-    @property
+    @setting
     def BASKET_API_KEY(self):
         return self("BASKET_API_KEY", "fake_basket_api_key")
 
-    @property
+    @setting
+    def SALESFORCE_BASKET_BULK_URI(self):
+        return self("SALESFORCE_BASKET_BULK_URI", "")
+
+    @setting
+    def SALESFORCE_BATCH_SIZE(self):
+        return self("SALESFORCE_BATCH_SIZE", 25, cast=int)
+
+    @setting
+    def SALESFORCE_BATCH_WINDOW(self):
+        return self("SALESFORCE_BATCH_WINDOW", 2.0, cast=float)
+
+    @setting
+    def SALESFORCE_CONNECT_TIMEOUT(self):
+        return self("SALESFORCE_CONNECT_TIMEOUT", 3.05, cast=float)
+
+    @setting
+    def SALESFORCE_READ_TIMEOUT(self):
+        return self("SALESFORCE_READ_TIMEOUT", 10, cast=float)
+
+    @setting
+    def SALESFORCE_RETRY_ATTEMPTS(self):
+        return self("SALESFORCE_RETRY_ATTEMPTS", 3, cast=int)
+
+    @setting
+    def SALESFORCE_POOL_SIZE(self):
+        return self("SALESFORCE_POOL_SIZE", 10, cast=int)
+
+    @setting
+    def JSON_CODEC(self):
+        return self("JSON_CODEC", "auto")
+
+    @setting
     def AWS_REGION(self):
         return self("AWS_REGION", "us-west-2")
 
-    @property
+    @setting
+    def AWS_ENDPOINT_URL(self):
+        return self("AWS_ENDPOINT_URL", "")
+
+    @setting
     def SUPPORTED_COUNTRIES(self):
         return self("SUPPORTED_COUNTRIES", "US, CA").split(",")
 
-    @property
+    @setting
     def SENTRY_URL(self):
         return self("SENTRY_URL", "")
 
-    @property
+    @setting
     def PAYMENT_API_KEY(self):
         return self("PAYMENT_API_KEY", "fake_payment_api_key")
 
-    @property
+    @setting
     def TOPIC_ARN_KEY(self):
         return self("TOPIC_ARN_KEY", "fake_topic_arn_key")
 
-    @property
+    @setting
     def SUPPORT_API_KEY(self):
         return self("SUPPORT_API_KEY", "fake_support_api_key")
 
-    @property
+    @setting
     def AWS_ACCESS_KEY_ID(self):
         return self("AWS_ACCESS_KEY_ID", "fake_aws_access_key_id")
 
-    @property
+    @setting
     def AWS_SECRET_ACCESS_KEY(self):
         return self("AWS_SECRET_ACCESS_KEY", "fake_aws_secret_access_key")
 
-    @property
+    @setting
     def HUB_API_KEY(self):
         return self("HUB_API_KEY", "fake_hub_api_key")
 
-    @property
+    @setting
     def AWS_EXECUTION_ENV(self):
         return self("AWS_EXECUTION_ENV", None)
 
-    @property
+    @setting
     def SWAGGER_UI(self):
         return self.DEPLOYED_ENV in ("stage", "qa", "dev", "fab")
 
-    @property
+    @setting
     def NEW_RELIC_ACCOUNT_ID(self):
         return self("NEW_RELIC_ACCOUNT_ID", 2_423_519)
 
-    @property
+    @setting
     def NEW_RELIC_TRUSTED_ACCOUNT_ID(self):
         return self("NEW_RELIC_TRUSTED_ACCOUNT_ID", 2_423_519)
 
-    @property
+    @setting
     def NEW_RELIC_SERVERLESS_MODE_ENABLED(self):
         return self("NEW_RELIC_SERVERLESS_MODE_ENABLED", True)
 
-    @property
+    @setting
     def NEW_RELIC_DISTRIBUTED_TRACING_ENABLED(self):
         return self("NEW_RELIC_DISTRIBUTED_TRACING_ENABLED", True)
 
-    @property
+    @setting
     def ALLOWED_ORIGIN_SYSTEMS(self):
         return self("ALLOWED_ORIGIN_SYSTEMS", "fake_origin1, fake_origin2").split(",")
 
-    @property
+    @setting
     def PAYMENT_EVENT_LIST(self):
         return self("PAYMENT_EVENT_LIST", "test.system, test.event").split(",")
 
-    @property
+    @setting
+    def MIA_REPLAY_WORKERS(self):
+        return self("MIA_REPLAY_WORKERS", 8, cast=int)
+
+    @setting
+    def MIA_CHECKPOINT_OVERLAP(self):
+        return self("MIA_CHECKPOINT_OVERLAP", 300, cast=int)
+
+    @setting
+    def MIA_DEADLINE_MARGIN(self):
+        return self("MIA_DEADLINE_MARGIN", 30, cast=int)
+
+    @setting
+    def MIA_MAX_REINVOCATIONS(self):
+        return self("MIA_MAX_REINVOCATIONS", 0, cast=int)
+
+    @setting
+    def MIA_SCAN_SHARDS(self):
+        return self("MIA_SCAN_SHARDS", 1, cast=int)
+
+    @setting
+    def HUB_PROVISION_TABLES(self):
+        return self("HUB_PROVISION_TABLES", default=True, cast=bool)
+
+    @setting
+    def HUB_ASYNC_INGEST(self):
+        return self("HUB_ASYNC_INGEST", default=False, cast=bool)
+
+    @setting
+    def EVENT_QUEUE_URL(self):
+        return self("EVENT_QUEUE_URL", "")
+
+    @setting
+    def EVENT_QUEUE_VISIBILITY_TIMEOUT(self):
+        return self("EVENT_QUEUE_VISIBILITY_TIMEOUT", 60, cast=int)
+
+    @setting
+    def EVENT_QUEUE_BATCH_SIZE(self):
+        return self("EVENT_QUEUE_BATCH_SIZE", 10, cast=int)
+
+    @setting
+    def HUB_RECENT_EVENTS_MAXSIZE(self):
+        return self("HUB_RECENT_EVENTS_MAXSIZE", 1024, cast=int)
+
+    @setting
+    def STRIPE_MAX_CONCURRENCY(self):
+        return self("STRIPE_MAX_CONCURRENCY", 4, cast=int)
+
+    @setting
+    def STRIPE_RATE_LIMIT(self):
+        return self("STRIPE_RATE_LIMIT", 20, cast=float)
+
+    @setting
+    def STRIPE_CATALOG_CACHE_TTL(self):
+        return self("STRIPE_CATALOG_CACHE_TTL", 3600, cast=int)
+
+    @setting
+    def STRIPE_CATALOG_CACHE_MAXSIZE(self):
+        return self("STRIPE_CATALOG_CACHE_MAXSIZE", 256, cast=int)
+
+    @setting
+    def STRIPE_CATALOG_WARM(self):
+        return self("STRIPE_CATALOG_WARM", default=False, cast=bool)
+
+    @setting
     def PROFILING_ENABLED(self):
         return ast.literal_eval(self("PROFILING_ENABLED", "False"))
 
-    @property
+    @setting
     def DEPLOY_DOMAIN(self):
         return self("DEPLOY_DOMAIN", "localhost")
 
-    @property
+    @setting
     def DEPLOYED_CUSTOMER(self):
         return self("DEPLOYED_CUSTOMER", "test")
 
-    @property
+    @setting
     def SRCTAR(self):
         return self("SRCTAR", ".src.tar.gz")
 
-    @property
+    @setting
     def USER(self):
         try:
             return pwd.getpwuid(os.getuid()).pw_name
         except:
             return "unknown"
 
-    @property
+    @setting
     def HOSTNAME(self):
         try:
             return platform.node()
@@ -331,11 +495,19 @@ class AutoConfigPlus(AutoConfig):  # pylint: disable=too-many-public-methods
     def __getattr__(self, attr):
         if attr == "create_doit_tasks":  # note: to keep pydoit's hands off
             return lambda: None
+        if attr == "values":  # not set yet while unpickling or in __init__
+            raise AttributeError(attr)
+        try:
+            return self.values[attr]
+        except KeyError:
+            pass
         result = self(attr)
         try:
-            return int(result)
+            result = int(result)
         except ValueError:
-            return result
+            pass
+        self.values[attr] = result
+        return result
 
 
 CFG = AutoConfigPlus()
@@ -2,12 +2,13 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-from typing import Optional, Any, List, Dict
-from pynamodb.attributes import UnicodeAttribute, ListAttribute
+from typing import Optional, Any, Iterable, List, Dict
+from pynamodb.attributes import UnicodeAttribute, ListAttribute, NumberAttribute
+from pynamodb.constants import BATCH_GET_PAGE_LIMIT
 from pynamodb.connection import Connection
 from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 from pynamodb.models import Model, DoesNotExist
-from pynamodb.exceptions import PutError, DeleteError, GetError
+from pynamodb.exceptions import PutError, DeleteError, GetError, UpdateError
 
 from shared.log import get_logger
 
@@ -144,6 +145,22 @@ class HubEvent:
             logger.debug("get event", event_id=event_id)
             return None
 
+    def get_events(self, event_ids: Iterable[str]) -> Dict[str, HubEventModel]:
+        """
+        Fetch many events with consistent BatchGetItem calls of at most
+        BATCH_GET_PAGE_LIMIT keys; pynamodb resubmits unprocessed keys
+        :param event_ids:
+        :return dict of event_id to HubEventModel for the events that exist:
+        """
+        unique_ids = list(dict.fromkeys(event_ids))
+        events: Dict[str, HubEventModel] = {}
+        for start in range(0, len(unique_ids), BATCH_GET_PAGE_LIMIT):
+            chunk = unique_ids[start : start + BATCH_GET_PAGE_LIMIT]
+            for hub_event in self.model.batch_get(chunk, consistent_read=True):
+                events[hub_event.event_id] = hub_event
+        logger.debug("get events", requested=len(unique_ids), found=len(events))
+        return events
+
     @staticmethod
     def save_event(hub_event: HubEventModel) -> bool:
         try:
@@ -165,6 +182,35 @@ class HubEvent:
             logger.error("append event", event_id=event_id, sent_system=sent_system)
             return False
 
+    def record_delivery(self, event_id: str, sent_system: str) -> bool:
+        """
+        Record that event_id was sent to sent_system with one conditional
+        UpdateItem, creating the event if it does not exist yet.  The condition
+        keeps sent_system free of duplicates when Lambdas race on an event.
+        :param event_id:
+        :param sent_system:
+        :return True if this is a new delivery, False if it was already recorded:
+        """
+        sent_systems = self.model.sent_system
+        try:
+            self.model(event_id).update(
+                actions=[sent_systems.set((sent_systems | []).append([sent_system]))],
+                condition=(
+                    sent_systems.does_not_exist() | ~sent_systems.contains(sent_system)
+                ),
+            )
+            return True
+        except UpdateError as e:
+            if e.cause_response_code == "ConditionalCheckFailedException":
+                logger.debug(
+                    "delivery already recorded",
+                    event_id=event_id,
+                    sent_system=sent_system,
+                )
+                return False
+            logger.error("record delivery", event_id=event_id, sent_system=sent_system)
+            raise e
+
     def remove_from_db(self, uid: str) -> bool:
         try:
             conn = Connection(host=self.model.Meta.host, region=self.model.Meta.region)
@@ -177,6 +223,83 @@ class HubEvent:
             return False
 
 
+def _create_checkpoint_model(table_name_, region_, host_) -> Any:
+    class CheckpointModel(Model):
+        class Meta:
+            table_name = table_name_
+            region = region_
+            if host_:
+                host = host_
+
+        name = UnicodeAttribute(hash_key=True)
+        watermark = NumberAttribute(null=True)
+        cursor = UnicodeAttribute(null=True)
+        scan_since = NumberAttribute(null=True)
+        scan_until = NumberAttribute(null=True)
+
+    return CheckpointModel
+
+
+# Fields persisted for a checkpoint, see Checkpoint
+CHECKPOINT_FIELDS = ("watermark", "cursor", "scan_since", "scan_until")
+
+
+class Checkpoint:
+    """
+    Progress of a resumable scan, keyed by name.  `watermark` is the newest
+    `created` timestamp up to which every event has been verified.  While a
+    scan is in progress `cursor` holds the id of the last verified event and
+    `scan_since`/`scan_until` the bounds of that scan, so a run cut short can
+    pick up where it stopped.
+    """
+
+    def __init__(self, table_name: str, region: str, host: Optional[str] = None):
+        self.model = _create_checkpoint_model(table_name, region, host)
+
+    def get_checkpoint(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            checkpoint = self.model.get(name, consistent_read=True)
+        except DoesNotExist:
+            logger.debug("get checkpoint does not exist", name=name)
+            return None
+        return {field: getattr(checkpoint, field) for field in CHECKPOINT_FIELDS}
+
+    def save_checkpoint(self, name: str, **fields: Any) -> bool:
+        """
+        Replace the checkpoint for name; fields not given are cleared
+        :param name:
+        :param fields: any of CHECKPOINT_FIELDS
+        :return: True if saved
+        """
+        try:
+            self.model(name, **fields).save()
+            logger.debug("checkpoint saved", name=name, **fields)
+            return True
+        except PutError:
+            logger.error("save checkpoint", name=name)
+            return False
+
+
+class LocalCheckpoint:
+    """
+    In-memory stand-in for Checkpoint, for tests and local runs without
+    DynamoDB
+    """
+
+    def __init__(self) -> None:
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
+
+    def get_checkpoint(self, name: str) -> Optional[Dict[str, Any]]:
+        checkpoint = self.checkpoints.get(name)
+        return dict(checkpoint) if checkpoint is not None else None
+
+    def save_checkpoint(self, name: str, **fields: Any) -> bool:
+        self.checkpoints[name] = {
+            field: fields.get(field) for field in CHECKPOINT_FIELDS
+        }
+        return True
+
+
 # This exists purely for type-checking, the actual model is dynamically
 # created in DbAccount
 class SubHubDeletedAccountModel(Model):
@@ -2,18 +2,25 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-from shared.types import FlaskResponse
-from shared.cfg import CFG
+from flask import Response
+
+from shared.build import get_build_info
+from shared.precomputed import JsonDocument
 from shared.log import get_logger
 
 logger = get_logger()
 
+DEPLOYED_DOCUMENT = None
+
 
-def get_deployed() -> FlaskResponse:
-    deployed = dict(
-        DEPLOYED_BY=CFG.DEPLOYED_BY,
-        DEPLOYED_ENV=CFG.DEPLOYED_ENV,
-        DEPLOYED_WHEN=CFG.DEPLOYED_WHEN,
-    )
-    logger.debug("deployed", deployed=deployed)
-    return deployed, 200
+def get_deployed() -> Response:
+    global DEPLOYED_DOCUMENT
+    if DEPLOYED_DOCUMENT is None:
+        build_info = get_build_info()
+        deployed = {
+            field: build_info[field]
+            for field in ("DEPLOYED_BY", "DEPLOYED_ENV", "DEPLOYED_WHEN")
+        }
+        logger.debug("deployed", deployed=deployed)
+        DEPLOYED_DOCUMENT = JsonDocument(deployed)
+    return DEPLOYED_DOCUMENT.response()
@@ -0,0 +1,139 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import time
+import uuid
+import sqlite3
+import threading
+
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple
+
+from shared.aws import get_client
+from shared.cfg import CFG
+from shared.log import get_logger
+
+logger = get_logger()
+
+EVENT_QUEUE = None
+
+
+class QueuedEvent(NamedTuple):
+    body: str
+    receipt: str
+
+
+class EventQueue(ABC):
+    """
+    Durable queue of raw webhook bodies, modelled on the SQS
+    send/receive/delete contract: a received message stays invisible for
+    `visibility_timeout` seconds and is redelivered unless it is deleted.
+    """
+
+    @abstractmethod
+    def send(self, body: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def receive(self, max_messages: int = 10) -> List[QueuedEvent]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, receipt: str) -> None:
+        raise NotImplementedError
+
+
+class SqsEventQueue(EventQueue):
+    def __init__(self, queue_url: str, visibility_timeout: int) -> None:
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.client = get_client("sqs", region_name=CFG.AWS_REGION)
+
+    def send(self, body: str) -> str:
+        response = self.client.send_message(QueueUrl=self.queue_url, MessageBody=body)
+        logger.debug("event queued", message_id=response.get("MessageId"))
+        return response.get("MessageId")
+
+    def receive(self, max_messages: int = 10) -> List[QueuedEvent]:
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, 10),
+            VisibilityTimeout=self.visibility_timeout,
+            WaitTimeSeconds=0,
+        )
+        return [
+            QueuedEvent(body=message["Body"], receipt=message["ReceiptHandle"])
+            for message in response.get("Messages", [])
+        ]
+
+    def delete(self, receipt: str) -> None:
+        self.client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+
+class SqliteEventQueue(EventQueue):
+    """
+    In-process stand-in for SQS used locally and in tests.  `path` may be a
+    file for durability across processes or ":memory:" for a single process.
+    """
+
+    def __init__(self, path: str = ":memory:", visibility_timeout: int = 60) -> None:
+        self.visibility_timeout = visibility_timeout
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "body TEXT NOT NULL, "
+                "visible_at REAL NOT NULL, "
+                "receipt TEXT)"
+            )
+
+    def send(self, body: str) -> str:
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO events (body, visible_at) VALUES (?, ?)",
+                (body, time.time()),
+            )
+        return str(cursor.lastrowid)
+
+    def receive(self, max_messages: int = 10) -> List[QueuedEvent]:
+        now = time.time()
+        received = []
+        with self.lock, self.connection:
+            rows = self.connection.execute(
+                "SELECT id, body FROM events WHERE visible_at <= ? ORDER BY id LIMIT ?",
+                (now, max_messages),
+            ).fetchall()
+            for row_id, body in rows:
+                receipt = uuid.uuid4().hex
+                self.connection.execute(
+                    "UPDATE events SET visible_at = ?, receipt = ? WHERE id = ?",
+                    (now + self.visibility_timeout, receipt, row_id),
+                )
+                received.append(QueuedEvent(body=body, receipt=receipt))
+        return received
+
+    def delete(self, receipt: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM events WHERE receipt = ?", (receipt,))
+
+    def __len__(self) -> int:
+        with self.lock:
+            (count,) = self.connection.execute("SELECT COUNT(*) FROM events").fetchone()
+        return count
+
+
+def get_event_queue() -> EventQueue:
+    global EVENT_QUEUE
+    if EVENT_QUEUE is None:
+        queue_url = CFG.EVENT_QUEUE_URL
+        if queue_url.startswith("https://"):
+            EVENT_QUEUE = SqsEventQueue(queue_url, CFG.EVENT_QUEUE_VISIBILITY_TIMEOUT)
+        else:
+            EVENT_QUEUE = SqliteEventQueue(
+                queue_url or ":memory:", CFG.EVENT_QUEUE_VISIBILITY_TIMEOUT
+            )
+        logger.info("event queue", queue=type(EVENT_QUEUE).__name__)
+    return EVENT_QUEUE
@@ -2,15 +2,30 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import json
+import time
+import queue
+import atexit
+import threading
 import logging.config
+import logging.handlers
+
+from collections import Counter
+from collections.abc import Mapping
+from functools import lru_cache
+from structlog import DropEvent
 
 from shared.cfg import CFG
-from typing import Any
+from typing import Any, Callable, Dict
 
 LOGGER = None
+LOG_LISTENER = None
+SAMPLED: Counter = Counter()
+SAMPLED_LOCK = threading.Lock()
+CENSORED = "*CENSORED*"
 CENSORED_EVENT_VALUES_BY_EVENT_KEY = {
-    "headers": ["Authorization", "X-Forwarded-For"],
-    "multiValueHeaders": ["Authorization"],
+    "headers": ["Authorization", "authorization", "X-Forwarded-For"],
+    "multiValueHeaders": ["Authorization", "authorization"],
 }
 
 dict_config = {
@@ -46,33 +61,254 @@ dict_config = {
 }
 
 
+class Lazy:
+    """
+    Log field computed only when the line passes the level check, see lazy
+    """
+
+    __slots__ = ("function", "args")
+
+    def __init__(self, function: Callable[..., Any], *args: Any) -> None:
+        self.function = function
+        self.args = args
+
+    def resolve(self) -> Any:
+        return self.function(*self.args)
+
+
+def lazy(function: Callable[..., Any], *args: Any) -> Lazy:
+    """
+    Defer an expensive log field until the line is known to be emitted:
+
+        logger.debug("Request body", body=lazy(request.get_data))
+
+    :param function: called with args to produce the field value
+    :param args:
+    :return:
+    """
+    return Lazy(function, *args)
+
+
+def sample_info(logger, method_name, event_dict):
+    # Keep one in LOG_INFO_SAMPLE_RATE info lines per event name
+    rate = CFG.LOG_INFO_SAMPLE_RATE
+    if rate <= 1 or method_name != "info":
+        return event_dict
+    with SAMPLED_LOCK:
+        SAMPLED[event_dict["event"]] += 1
+        count = SAMPLED[event_dict["event"]]
+    if (count - 1) % rate:
+        raise DropEvent
+    event_dict["sampled"] = rate
+    return event_dict
+
+
+def resolve_lazy(logger, method_name, event_dict):
+    for key, value in event_dict.items():
+        if isinstance(value, Lazy):
+            event_dict[key] = value.resolve()
+    return event_dict
+
+
+def truncate_fields(logger, method_name, event_dict):
+    # Fields whose JSON form is over LOG_MAX_FIELD_SIZE characters are
+    # replaced with its first LOG_MAX_FIELD_SIZE characters and full size
+    limit = CFG.LOG_MAX_FIELD_SIZE
+    if not limit:
+        return event_dict
+    for key, value in event_dict.items():
+        if key == "event":
+            continue
+        if isinstance(value, bytes):
+            text = value.decode("utf-8", errors="replace")
+        elif isinstance(value, str):
+            text = value
+        elif isinstance(value, (dict, list, tuple)):
+            text = json.dumps(value, default=str, separators=(",", ":"))
+        else:
+            continue
+        if len(text) > limit:
+            event_dict[key] = dict(truncated=text[:limit], size=len(text))
+    return event_dict
+
+
 def event_uppercase(logger, method_name, event_dict):
     event_dict["event"] = event_dict["event"].upper()
     return event_dict
 
 
-def censor_event_dict(event_dict):
-    for k, v in event_dict.items():
-        if isinstance(v, dict):
-            censor_event_dict(v)
+def render_mappings(logger, method_name, event_dict):
+    # Read-only views such as hub.vendor.view.EventView are logged as the
+    # JSON objects they wrap
+    for key, value in event_dict.items():
+        if isinstance(value, Mapping) and not isinstance(value, dict):
+            event_dict[key] = dict(value)
+    return event_dict
+
+
+@lru_cache(maxsize=8)
+def censor_tree(fields: str) -> Dict[str, Any]:
+    """
+    Compile the censored key paths into a tree of nested dicts, None marking
+    a censored key.  The paths are the headers in
+    CENSORED_EVENT_VALUES_BY_EVENT_KEY and the comma separated dotted paths
+    in fields, e.g. "data.object.email,last4".
+    :param fields: LOG_CENSOR_FIELDS
+    :return:
+    """
+    paths = [
+        [event_key, event_value]
+        for event_key, event_values in CENSORED_EVENT_VALUES_BY_EVENT_KEY.items()
+        for event_value in event_values
+    ]
+    paths.extend(field.strip().split(".") for field in fields.split(","))
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        if not all(path):
+            continue
+        node = tree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+            if node is None:
+                break
+        else:
+            node[path[-1]] = None
+    return tree
+
+
+def censor_mapping(value: Mapping, tree: Dict[str, Any]) -> Mapping:
+    """
+    Censor the keys of tree found in value.  Only the keys in tree are looked
+    up, and the logged object is never modified: the mappings along a
+    censored path are copied instead.
+    :param value:
+    :param tree: from censor_tree
+    :return: value, or a copy of it with the tree's keys censored
+    """
+    censored = None
+    for key, subtree in tree.items():
+        if key not in value:
+            continue
+        if subtree is None:
+            replacement = CENSORED
         else:
-            for event_key, event_values in CENSORED_EVENT_VALUES_BY_EVENT_KEY.items():
-                if event_dict is not None:
-                    _event_key = event_dict.get(event_key)
-                    if _event_key:
-                        for event_value in event_values:
-                            _event_value = _event_key.get(event_value)
-                            if _event_key:
-                                event_dict[event_key][event_value] = "*CENSORED*"
-            return event_dict
+            child = value[key]
+            if not isinstance(child, Mapping):
+                continue
+            replacement = censor_mapping(child, subtree)
+            if replacement is child:
+                continue
+        if censored is None:
+            censored = dict(value)
+        censored[key] = replacement
+    return value if censored is None else censored
+
+
+def censor_event_dict(event_dict):
+    # Looks up the censored paths from the top of the event and of each
+    # logged mapping, so the work does not grow with the payload size
+    tree = censor_tree(CFG.LOG_CENSOR_FIELDS)
+    event_dict = censor_mapping(event_dict, tree)
+    for key, value in event_dict.items():
+        if isinstance(value, Mapping):
+            event_dict[key] = censor_mapping(value, tree)
+    return event_dict
 
 
 def censor_header(logger, method_name, event_dict):
     return censor_event_dict(event_dict)
 
 
+class BufferedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a bounded queue for a QueueListener thread to format and
+    write, so emitting a log line costs about one enqueue.  When the queue is
+    full the line is dropped and counted, or with overflow "block" the
+    caller waits for room.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop") -> None:
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def start_log_listener() -> logging.handlers.QueueListener:
+    """
+    Route the configured loggers through a BufferedQueueHandler and start the
+    listener thread writing to their stream handler
+    :return:
+    """
+    root = logging.getLogger()
+    stream_handler = root.handlers[0]
+    queue_handler = BufferedQueueHandler(
+        queue.Queue(CFG.LOG_QUEUE_SIZE), CFG.LOG_QUEUE_OVERFLOW
+    )
+    for name in dict_config["loggers"]:
+        handlers = logging.getLogger(name or None).handlers
+        handlers[:] = [
+            queue_handler if handler is stream_handler else handler
+            for handler in handlers
+        ]
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, stream_handler, respect_handler_level=True
+    )
+    listener.queue_handler = queue_handler
+    listener.start()
+    atexit.register(flush_logs)
+    return listener
+
+
+def flush_logs(timeout: float = 2.0) -> None:
+    """
+    Wait for the queued log lines to be written, e.g. before a Lambda
+    invocation ends and the container is frozen.  Does nothing unless
+    LOG_ASYNC is on.
+    :param timeout: seconds to wait for the listener thread
+    """
+    if LOG_LISTENER is None:
+        return
+    log_queue = LOG_LISTENER.queue
+    deadline = time.monotonic() + timeout
+    with log_queue.all_tasks_done:
+        while log_queue.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            log_queue.all_tasks_done.wait(remaining)
+    queue_handler = LOG_LISTENER.queue_handler
+    if queue_handler.dropped:
+        dropped, queue_handler.dropped = queue_handler.dropped, 0
+        record = logging.makeLogRecord(
+            dict(
+                name=__name__,
+                levelno=logging.WARNING,
+                levelname="WARNING",
+                msg="LOG LINES DROPPED",
+                dropped=dropped,
+            )
+        )
+        for handler in LOG_LISTENER.handlers:
+            handler.handle(record)
+    for handler in LOG_LISTENER.handlers:
+        handler.flush()
+
+
 def get_logger() -> Any:
-    global LOGGER
+    global LOGGER, LOG_LISTENER
     if not LOGGER:
         from structlog import configure, processors, stdlib, threadlocal, get_logger
         from pythonjsonlogger import jsonlogger
@@ -86,12 +322,20 @@ def get_logger() -> Any:
             processors=[
                 # Filter only the required log levels into the log output
                 stdlib.filter_by_level,
+                # Drop repeated info lines when LOG_INFO_SAMPLE_RATE is set
+                sample_info,
+                # Compute lazy fields now that the line will be emitted
+                resolve_lazy,
                 # Adds logger=module_name (e.g __main__)
                 stdlib.add_logger_name,
                 # Uppercase structlog's event name which shouldn't be convoluted with AWS events.
                 event_uppercase,
+                # Log mapping views as plain dicts
+                render_mappings,
                 # Censor secure data
                 censor_header,
+                # Cut oversized fields down to LOG_MAX_FIELD_SIZE
+                truncate_fields,
                 # Allow for string interpolation
                 stdlib.PositionalArgumentsFormatter(),
                 # Render timestamps to ISO 8601
@@ -108,5 +352,7 @@ def get_logger() -> Any:
             ],
             cache_logger_on_first_use=True,
         )
+        if CFG.LOG_ASYNC:
+            LOG_LISTENER = start_log_listener()
         LOGGER = get_logger()
     return LOGGER
@@ -0,0 +1,85 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import bisect
+import threading
+
+from typing import Any, Dict, Tuple
+
+# Upper bounds, in milliseconds, of the latency histogram buckets
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+)
+
+HISTOGRAMS: Dict[str, "LatencyHistogram"] = {}
+HISTOGRAMS_LOCK = threading.Lock()
+
+
+class LatencyHistogram:
+    """
+    Process-wide latency histogram with one series per label, e.g. an HTTP
+    status code.  Observations land in the first bucket whose upper bound is
+    at least the latency; slower ones are counted in the "+Inf" bucket.
+    """
+
+    def __init__(self, name: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.name = name
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label: Any, seconds: float) -> None:
+        latency_ms = seconds * 1000
+        index = bisect.bisect_left(self.buckets, latency_ms)
+        with self.lock:
+            series = self.series.get(str(label))
+            if series is None:
+                series = dict(count=0, sum_ms=0.0, counts=[0] * (len(self.buckets) + 1))
+                self.series[str(label)] = series
+            series["count"] += 1
+            series["sum_ms"] += latency_ms
+            series["counts"][index] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        bounds = [str(bucket) for bucket in self.buckets] + ["+Inf"]
+        with self.lock:
+            return {
+                label: dict(
+                    count=series["count"],
+                    sum_ms=round(series["sum_ms"], 3),
+                    buckets=dict(zip(bounds, series["counts"])),
+                )
+                for label, series in self.series.items()
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.series.clear()
+
+
+def get_histogram(name: str) -> LatencyHistogram:
+    with HISTOGRAMS_LOCK:
+        histogram = HISTOGRAMS.get(name)
+        if histogram is None:
+            histogram = HISTOGRAMS[name] = LatencyHistogram(name)
+        return histogram
+
+
+def snapshot() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Current state of every histogram, suitable for a structured log line
+    :return: histogram name -> label -> count, sum_ms and bucket counts
+    """
+    with HISTOGRAMS_LOCK:
+        histograms = list(HISTOGRAMS.values())
+    return {histogram.name: histogram.snapshot() for histogram in histograms}
@@ -0,0 +1,26 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import hashlib
+
+from flask import Response, request
+from typing import Any, Dict
+
+
+class JsonDocument:
+    """
+    JSON body serialised once, with a strong ETag, so serving it costs a
+    header comparison; a matching If-None-Match gets a 304
+    """
+
+    def __init__(self, document: Dict[str, Any]) -> None:
+        self.document = document
+        self.body = json.dumps(document, sort_keys=True).encode("utf-8")
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+    def response(self) -> Response:
+        response = Response(self.body, mimetype="application/json")
+        response.set_etag(self.etag)
+        return response.make_conditional(request)
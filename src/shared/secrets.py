@@ -3,19 +3,19 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 import os
-import boto3
 import base64
 import json
 
 from typing import Dict, Any
 
+from shared.aws import get_client
 from shared.cfg import CFG
 from shared.exceptions import SecretStringMissingError
 
 
 def get_secret(secret_id) -> Dict[str, Any]:
     """Fetch secret via boto3."""
-    client = boto3.client(service_name="secretsmanager")
+    client = get_client("secretsmanager")
     get_secret_value_response = client.get_secret_value(SecretId=secret_id)
 
     if "SecretString" in get_secret_value_response:
@@ -26,3 +26,4 @@ def get_secret(secret_id) -> Dict[str, Any]:
 
 if CFG.AWS_EXECUTION_ENV:
     os.environ.update(get_secret(f"{CFG.DEPLOYED_ENV}/{CFG.PROJECT_NAME}"))
+    CFG.reload()
@@ -0,0 +1,77 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import threading
+
+from typing import Any, Callable, Dict, NamedTuple, Union
+
+from shared.cfg import CFG
+from shared.log import get_logger
+
+logger = get_logger()
+
+CODEC = None
+CODEC_LOCK = threading.Lock()
+
+
+class Codec(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Union[bytes, str]], Any]
+
+
+def json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def json_codec() -> Codec:
+    return Codec("json", json_dumps, json.loads)
+
+
+def orjson_codec() -> Codec:
+    import orjson
+
+    return Codec("orjson", orjson.dumps, orjson.loads)
+
+
+CODECS: Dict[str, Callable[[], Codec]] = {"json": json_codec, "orjson": orjson_codec}
+
+
+def get_codec() -> Codec:
+    """
+    Codec named by JSON_CODEC, resolved once per process.  "auto" picks
+    orjson when it is installed and falls back to the json module.
+    """
+    global CODEC
+    with CODEC_LOCK:
+        if CODEC is None:
+            name = CFG.JSON_CODEC
+            if name == "auto":
+                try:
+                    CODEC = orjson_codec()
+                except ImportError:
+                    CODEC = json_codec()
+            else:
+                CODEC = CODECS[name]()
+            logger.debug("json codec", codec=CODEC.name)
+    return CODEC
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize obj to compact UTF-8 JSON
+    :param obj:
+    :return:
+    """
+    return get_codec().dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Parse a JSON document
+    :param data: bytes or str
+    :return:
+    """
+    return get_codec().loads(data)
@@ -0,0 +1,41 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from unittest import TestCase
+from mock import MagicMock, patch
+
+from shared import aws
+
+
+class GetClientTest(TestCase):
+    def setUp(self) -> None:
+        aws.clear_clients()
+        self.addCleanup(aws.clear_clients)
+        client_patcher = patch("boto3.client", side_effect=lambda **kw: MagicMock())
+        self.addCleanup(client_patcher.stop)
+        self.mock_client = client_patcher.start()
+
+    def test_client_reused(self):
+        client = aws.get_client("sns", region_name="us-west-2")
+        assert aws.get_client("sns", region_name="us-west-2") is client  # nosec
+        self.mock_client.assert_called_once_with(
+            service_name="sns", region_name="us-west-2"
+        )
+
+    def test_client_per_arguments(self):
+        sns = aws.get_client("sns", region_name="us-west-2")
+        assert aws.get_client("sns", region_name="us-east-1") is not sns  # nosec
+        assert aws.get_client("sqs", region_name="us-west-2") is not sns  # nosec
+        assert self.mock_client.call_count == 3  # nosec
+
+    def test_endpoint_url(self):
+        with patch(
+            "shared.cfg.AutoConfigPlus.AWS_ENDPOINT_URL", "http://localhost:4566"
+        ):
+            aws.get_client("sns", region_name="us-west-2")
+        self.mock_client.assert_called_once_with(
+            service_name="sns",
+            region_name="us-west-2",
+            endpoint_url="http://localhost:4566",
+        )
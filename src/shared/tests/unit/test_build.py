@@ -0,0 +1,14 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import runpy
+
+from hub.shared.build import BUILD_INFO_FIELDS, write_build_info
+
+
+def test_write_build_info(tmpdir):
+    path = str(tmpdir.join("build_info.py"))
+    build_info = write_build_info(path)
+    assert sorted(build_info) == sorted(BUILD_INFO_FIELDS)
+    assert runpy.run_path(path)["BUILD_INFO"] == build_info
@@ -0,0 +1,45 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+
+from mock import patch
+
+from shared.cfg import AutoConfigPlus
+
+
+def test_values_resolved_once():
+    config = AutoConfigPlus()
+    with patch("shared.cfg.git", return_value="v1.2.3") as git:
+        assert config.VERSION == "v1.2.3"
+        assert config.VERSION == "v1.2.3"
+    git.assert_called_once_with("describe --abbrev=7 --always")
+
+
+def test_reload():
+    config = AutoConfigPlus()
+    with patch.dict(os.environ, {"EVENT_TABLE": "events-one"}):
+        assert config.EVENT_TABLE == "events-one"
+        os.environ["EVENT_TABLE"] = "events-two"
+        assert config.EVENT_TABLE == "events-one"
+        config.reload()
+        assert config.EVENT_TABLE == "events-two"
+
+
+def test_undeclared_values_resolved_once():
+    config = AutoConfigPlus()
+    with patch.dict(os.environ, {"SOME_COUNT": "3"}):
+        assert config.SOME_COUNT == 3
+        os.environ["SOME_COUNT"] = "4"
+        assert config.SOME_COUNT == 3
+        config.reload()
+        assert config.SOME_COUNT == 4
+
+
+def test_patched_value_wins():
+    config = AutoConfigPlus()
+    assert config.STRIPE_MOCK_PORT == 12112
+    with patch("shared.cfg.AutoConfigPlus.STRIPE_MOCK_PORT", 1):
+        assert config.STRIPE_MOCK_PORT == 1
+    assert config.STRIPE_MOCK_PORT == 12112
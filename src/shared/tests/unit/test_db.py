@@ -0,0 +1,121 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from botocore.exceptions import ClientError
+from mock import patch
+from pynamodb.exceptions import UpdateError
+
+from hub.shared.db import Checkpoint, HubEvent, LocalCheckpoint
+
+
+def update_error(code):
+    return UpdateError(
+        cause=ClientError({"Error": {"Code": code, "Message": code}}, "UpdateItem")
+    )
+
+
+@pytest.fixture
+def update_item():
+    with patch("pynamodb.connection.table.TableConnection.update_item") as mock:
+        yield mock
+
+
+def test_record_delivery_new(update_item):
+    update_item.return_value = {
+        "Attributes": {"event_id": {"S": "evt_1"}, "sent_system": {"L": []}}
+    }
+    hub_event = HubEvent(table_name="events-testing", region="us-west-2")
+    assert hub_event.record_delivery("evt_1", "salesforce")
+    update_item.assert_called_once()
+    assert update_item.call_args[0][0] == "evt_1"
+    assert update_item.call_args[1]["condition"] is not None
+
+
+def test_record_delivery_duplicate(update_item):
+    update_item.side_effect = update_error("ConditionalCheckFailedException")
+    hub_event = HubEvent(table_name="events-testing", region="us-west-2")
+    assert not hub_event.record_delivery("evt_1", "salesforce")
+
+
+def test_record_delivery_error(update_item):
+    update_item.side_effect = update_error("ProvisionedThroughputExceededException")
+    hub_event = HubEvent(table_name="events-testing", region="us-west-2")
+    with pytest.raises(UpdateError):
+        hub_event.record_delivery("evt_1", "salesforce")
+
+
+def test_get_events_batches():
+    table_name = "events-testing"
+    batches = []
+
+    def batch_get_item(keys, consistent_read=None, attributes_to_get=None):
+        batches.append([key["event_id"] for key in keys])
+        found = [
+            {"event_id": {"S": key["event_id"]}, "sent_system": {"L": []}}
+            for key in keys
+            if key["event_id"].endswith("0")
+        ]
+        if len(batches) == 1:
+            # Return the last key unprocessed once to exercise the retry
+            return {
+                "Responses": {table_name: found[:-1]},
+                "UnprocessedKeys": {table_name: {"Keys": keys[-1:]}},
+            }
+        return {"Responses": {table_name: found}, "UnprocessedKeys": {}}
+
+    event_ids = [f"evt_{index}" for index in range(205)] + ["evt_0"]
+    with patch(
+        "pynamodb.connection.table.TableConnection.batch_get_item",
+        side_effect=batch_get_item,
+    ):
+        hub_event = HubEvent(table_name=table_name, region="us-west-2")
+        events = hub_event.get_events(event_ids)
+
+    assert [len(batch) for batch in batches] == [100, 1, 100, 5]
+    assert sorted(events) == sorted(f"evt_{index}" for index in range(0, 205, 10))
+    assert events["evt_0"].event_id == "evt_0"
+
+
+def test_get_events_empty():
+    hub_event = HubEvent(table_name="events-testing", region="us-west-2")
+    assert hub_event.get_events([]) == {}
+
+
+def test_checkpoint_round_trip():
+    with patch("pynamodb.connection.table.TableConnection.put_item") as put_item, patch(
+        "pynamodb.connection.table.TableConnection.get_item",
+        return_value={
+            "Item": {
+                "name": {"S": "mia"},
+                "watermark": {"N": "1570000000"},
+                "cursor": {"S": "evt_1"},
+            }
+        },
+    ):
+        checkpoints = Checkpoint(table_name="checkpoints-testing", region="us-west-2")
+        assert checkpoints.save_checkpoint("mia", watermark=1570000000, cursor="evt_1")
+        checkpoint = checkpoints.get_checkpoint("mia")
+
+    assert put_item.call_args[0][0] == "mia"
+    assert checkpoint == dict(
+        watermark=1570000000, cursor="evt_1", scan_since=None, scan_until=None
+    )
+
+
+def test_checkpoint_missing():
+    with patch("pynamodb.connection.table.TableConnection.get_item", return_value={}):
+        checkpoints = Checkpoint(table_name="checkpoints-testing", region="us-west-2")
+        assert checkpoints.get_checkpoint("mia") is None
+
+
+def test_local_checkpoint():
+    checkpoints = LocalCheckpoint()
+    assert checkpoints.get_checkpoint("mia") is None
+    checkpoints.save_checkpoint("mia", watermark=10, cursor="evt_1")
+    checkpoints.save_checkpoint("mia", watermark=20)
+    assert checkpoints.get_checkpoint("mia") == dict(
+        watermark=20, cursor=None, scan_since=None, scan_until=None
+    )
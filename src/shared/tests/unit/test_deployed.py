@@ -2,9 +2,15 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import json
+
+from flask import Flask
+
 from hub.shared.cfg import CFG
 from hub.shared.deployed import get_deployed
 
+app = Flask(__name__)
+
 
 def test_get_deployed():
     """
@@ -15,7 +21,9 @@ def test_get_deployed():
         DEPLOYED_ENV=CFG.DEPLOYED_ENV,
         DEPLOYED_WHEN=CFG.DEPLOYED_WHEN,
     )
-    actual, rc = get_deployed()
-    assert rc == 200
+    with app.test_request_context("/hub/deployed"):
+        response = get_deployed()
+    actual = json.loads(response.get_data())
+    assert response.status_code == 200
     assert actual["DEPLOYED_BY"] == expect["DEPLOYED_BY"]
     assert actual["DEPLOYED_ENV"] == expect["DEPLOYED_ENV"]
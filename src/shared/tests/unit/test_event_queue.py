@@ -0,0 +1,31 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from hub.shared.event_queue import SqliteEventQueue
+
+
+def test_send_receive_delete():
+    queue = SqliteEventQueue(":memory:", visibility_timeout=60)
+    queue.send('{"id": "evt_1"}')
+    queue.send('{"id": "evt_2"}')
+    messages = queue.receive(10)
+    assert [m.body for m in messages] == ['{"id": "evt_1"}', '{"id": "evt_2"}']
+    queue.delete(messages[0].receipt)
+    assert len(queue) == 1
+
+
+def test_received_messages_are_invisible_until_timeout():
+    queue = SqliteEventQueue(":memory:", visibility_timeout=60)
+    queue.send("body")
+    assert len(queue.receive(10)) == 1
+    assert queue.receive(10) == []
+
+
+def test_undeleted_messages_are_redelivered():
+    queue = SqliteEventQueue(":memory:", visibility_timeout=0)
+    queue.send("body")
+    first = queue.receive(1)
+    second = queue.receive(1)
+    assert first[0].body == second[0].body == "body"
+    assert first[0].receipt != second[0].receipt
@@ -0,0 +1,198 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import io
+import queue
+import logging
+
+import pytest
+
+from mock import MagicMock, patch
+from structlog import DropEvent, stdlib, wrap_logger
+
+from shared import log
+from shared.log import (
+    CENSORED,
+    censor_event_dict,
+    lazy,
+    resolve_lazy,
+    sample_info,
+    truncate_fields,
+)
+
+
+def test_lazy_field_skipped_below_level():
+    expensive = MagicMock(return_value="body")
+    stdlib_logger = logging.getLogger("test_log.lazy")
+    stdlib_logger.setLevel(logging.WARNING)
+    logger = wrap_logger(
+        stdlib_logger,
+        processors=[stdlib.filter_by_level, resolve_lazy, lambda *args: args[2]],
+        wrapper_class=stdlib.BoundLogger,
+    )
+    with patch.object(stdlib_logger, "debug") as debug, patch.object(
+        stdlib_logger, "warning"
+    ) as warning:
+        logger.debug("Request body", body=lazy(expensive))
+        expensive.assert_not_called()
+        debug.assert_not_called()
+        logger.warning("Request body", body=lazy(expensive, 1))
+    expensive.assert_called_once_with(1)
+    assert warning.call_args[1]["body"] == "body"
+
+
+def test_resolve_lazy():
+    event_dict = resolve_lazy(None, "info", dict(event="e", body=lazy(len, "abc")))
+    assert event_dict == dict(event="e", body=3)
+
+
+def test_truncate_fields():
+    payload = {"data": "x" * 100}
+    with patch("shared.cfg.AutoConfigPlus.LOG_MAX_FIELD_SIZE", 20):
+        event_dict = truncate_fields(
+            None,
+            "info",
+            dict(event="e" * 30, payload=payload, body=b"y" * 30, small="z", count=10),
+        )
+    assert event_dict["event"] == "e" * 30
+    assert event_dict["payload"] == dict(truncated='{"data":"' + "x" * 11, size=111)
+    assert event_dict["body"] == dict(truncated="y" * 20, size=30)
+    assert event_dict["small"] == "z"
+    assert event_dict["count"] == 10
+
+
+def test_truncate_fields_disabled():
+    with patch("shared.cfg.AutoConfigPlus.LOG_MAX_FIELD_SIZE", 0):
+        event_dict = truncate_fields(None, "info", dict(event="e", body="y" * 10000))
+    assert event_dict["body"] == "y" * 10000
+
+
+def test_sample_info():
+    log.SAMPLED.clear()
+    kept = []
+    with patch("shared.cfg.AutoConfigPlus.LOG_INFO_SAMPLE_RATE", 3):
+        for index in range(7):
+            try:
+                kept.append(sample_info(None, "info", dict(event="repeated", n=index)))
+            except DropEvent:
+                pass
+        with pytest.raises(DropEvent):
+            sample_info(None, "info", dict(event="repeated"))
+        assert sample_info(None, "error", dict(event="repeated")) == dict(
+            event="repeated"
+        )
+    assert [event_dict["n"] for event_dict in kept] == [0, 3, 6]
+    assert all(event_dict["sampled"] == 3 for event_dict in kept)
+    log.SAMPLED.clear()
+
+
+def test_sample_info_disabled():
+    assert sample_info(None, "info", dict(event="e")) == dict(event="e")
+
+
+def test_censor_headers():
+    aws_event = {
+        "headers": {"Authorization": "secret", "Host": "hub"},
+        "multiValueHeaders": {"Authorization": ["secret"]},
+        "body": "{}",
+    }
+    event_dict = censor_event_dict(
+        dict(subhub_event=aws_event, headers={"X-Forwarded-For": "1.2.3.4"})
+    )
+    assert event_dict["subhub_event"] == {
+        "headers": {"Authorization": CENSORED, "Host": "hub"},
+        "multiValueHeaders": {"Authorization": CENSORED},
+        "body": "{}",
+    }
+    assert event_dict["headers"] == {"X-Forwarded-For": CENSORED}
+    # The logged objects themselves are left alone
+    assert aws_event["headers"]["Authorization"] == "secret"
+
+
+def test_censor_card_fields():
+    payload = {
+        "id": "evt_1",
+        "data": {"object": {"email": "a@b.c", "last4": "4242", "brand": "Visa"}},
+    }
+    message = {"Email": "a@b.c", "Last_4_Digits__c": "4242", "Event_Id__c": "evt_1"}
+    event_dict = censor_event_dict(
+        dict(event="e", payload=payload, data=message, email="a@b.c", count=1)
+    )
+    assert event_dict["payload"]["data"]["object"] == {
+        "email": CENSORED,
+        "last4": CENSORED,
+        "brand": "Visa",
+    }
+    assert event_dict["data"] == {
+        "Email": CENSORED,
+        "Last_4_Digits__c": CENSORED,
+        "Event_Id__c": "evt_1",
+    }
+    assert event_dict["email"] == CENSORED
+    assert event_dict["event"] == "e"
+    assert event_dict["count"] == 1
+    assert payload["data"]["object"]["email"] == "a@b.c"
+
+
+def test_censor_fields_configurable():
+    payload = {"data": {"object": {"email": "a@b.c", "name": "Jo"}}}
+    with patch("shared.cfg.AutoConfigPlus.LOG_CENSOR_FIELDS", "data.object.name"):
+        event_dict = censor_event_dict(dict(event="e", payload=payload))
+    assert event_dict["payload"]["data"]["object"] == {
+        "email": "a@b.c",
+        "name": CENSORED,
+    }
+
+
+def test_censor_without_matches_returns_same_objects():
+    payload = {"data": {"object": {"id": "cus_1"}}}
+    event_dict = censor_event_dict(dict(event="e", payload=payload))
+    assert event_dict["payload"] is payload
+
+
+def test_queue_handler_drops_on_overflow():
+    handler = log.BufferedQueueHandler(queue.Queue(1))
+    for index in range(3):
+        handler.handle(logging.makeLogRecord(dict(msg=f"line {index}")))
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
+
+
+@pytest.fixture
+def log_listener():
+    stream = io.StringIO()
+    stream_handler = logging.StreamHandler(stream)
+    test_logger = logging.getLogger("test_log.async")
+    test_logger.propagate = False
+    test_logger.handlers = [stream_handler]
+    with patch.object(logging.getLogger(), "handlers", [stream_handler]), patch.object(
+        log, "dict_config", dict(loggers={"test_log.async": {}})
+    ):
+        listener = log.start_log_listener()
+    with patch.object(log, "LOG_LISTENER", listener):
+        yield test_logger, stream
+    listener.stop()
+    test_logger.handlers = []
+
+
+def test_async_logging_flushed(log_listener):
+    test_logger, stream = log_listener
+    assert isinstance(test_logger.handlers[0], log.BufferedQueueHandler)
+    for index in range(100):
+        test_logger.warning("line %d", index)
+    log.flush_logs()
+    assert stream.getvalue().splitlines() == [f"line {index}" for index in range(100)]
+
+
+def test_flush_reports_dropped_lines(log_listener):
+    test_logger, stream = log_listener
+    test_logger.handlers[0].dropped = 3
+    log.flush_logs()
+    assert stream.getvalue() == "LOG LINES DROPPED\n"
+    assert test_logger.handlers[0].dropped == 0
+
+
+def test_flush_without_listener():
+    with patch.object(log, "LOG_LISTENER", None):
+        log.flush_logs()
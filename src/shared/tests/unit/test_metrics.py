@@ -0,0 +1,26 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from shared import metrics
+
+
+def test_observe_buckets_per_label():
+    histogram = metrics.LatencyHistogram("test", buckets=(10, 100))
+    histogram.observe(200, 0.005)
+    histogram.observe(200, 0.050)
+    histogram.observe(503, 1.5)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["200"]["count"] == 2
+    assert snapshot["200"]["buckets"] == {"10": 1, "100": 1, "+Inf": 0}
+    assert snapshot["503"]["buckets"] == {"10": 0, "100": 0, "+Inf": 1}
+    assert snapshot["503"]["sum_ms"] == 1500.0
+
+
+def test_get_histogram_is_shared():
+    histogram = metrics.get_histogram("test_shared")
+    assert metrics.get_histogram("test_shared") is histogram
+    histogram.reset()
+    histogram.observe("ok", 0.001)
+    assert metrics.snapshot()["test_shared"]["ok"]["count"] == 1
@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+
+import pytest
+
+from mock import patch
+
+from shared import serialize
+
+MESSAGE = {"Event_Id__c": "evt_1", "Amount": 1000, "Name": "café", "items": [1]}
+
+
+@pytest.fixture
+def codec_name():
+    def select(name):
+        serialize.CODEC = None
+        patcher = patch("shared.cfg.AutoConfigPlus.JSON_CODEC", name)
+        patcher.start()
+        patchers.append(patcher)
+
+    patchers = []
+    yield select
+    for patcher in patchers:
+        patcher.stop()
+    serialize.CODEC = None
+
+
+def test_json_codec(codec_name):
+    codec_name("json")
+    body = serialize.dumps(MESSAGE)
+    assert isinstance(body, bytes)
+    assert body == json.dumps(MESSAGE, separators=(",", ":")).encode("utf-8")
+    assert serialize.loads(body) == MESSAGE
+    assert serialize.loads(body.decode("utf-8")) == MESSAGE
+    assert serialize.get_codec().name == "json"
+
+
+def test_auto_codec(codec_name):
+    codec_name("auto")
+    try:
+        import orjson  # noqa: F401
+
+        expected = "orjson"
+    except ImportError:
+        expected = "json"
+    assert serialize.get_codec().name == expected
+    assert serialize.loads(serialize.dumps(MESSAGE)) == MESSAGE
+
+
+def test_auto_codec_without_orjson(codec_name):
+    codec_name("auto")
+    with patch.dict("sys.modules", {"orjson": None}):
+        assert serialize.get_codec().name == "json"
+
+
+def test_codec_resolved_once(codec_name):
+    codec_name("json")
+    assert serialize.get_codec() is serialize.get_codec()
+
+
+def test_invalid_document_raises_value_error(codec_name):
+    codec_name("auto")
+    with pytest.raises(ValueError):
+        serialize.loads(b"imalittleteapot")
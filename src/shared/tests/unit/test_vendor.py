@@ -2,6 +2,7 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 import os
+import threading
 import json
 from unittest import TestCase
 from mock import patch
@@ -380,6 +381,7 @@ class TestStripeInvoiceCalls(TestCase):
 
 class TestStripePlanCalls(TestCase):
     def setUp(self) -> None:
+        vendor.clear_catalog_cache()
         with open(os.path.join(DIRECTORY, "fixtures/stripe_plan_test1.json")) as fh:
             plan = json.loads(fh.read())
         self.plan = convert_to_stripe_object(plan)
@@ -420,9 +422,68 @@ class TestStripePlanCalls(TestCase):
         with self.assertRaises(InvalidRequestError) as e:
             vendor.retrieve_stripe_plan("plan_test1")
 
+    def test_retrieve_cached(self):
+        self.retrieve_plan_mock.return_value = self.plan
+
+        assert vendor.retrieve_stripe_plan("plan_test1") == self.plan  # nosec
+        assert vendor.retrieve_stripe_plan("plan_test1") == self.plan  # nosec
+
+        self.retrieve_plan_mock.assert_called_once()
+        assert vendor.PLAN_CACHE.stats() == dict(size=1, hits=1, misses=1)  # nosec
+
+    def test_retrieve_invalidated(self):
+        self.retrieve_plan_mock.return_value = self.plan
+
+        vendor.retrieve_stripe_plan("plan_test1")
+        vendor.invalidate_stripe_plan("plan_test1")
+        vendor.retrieve_stripe_plan("plan_test1")
+
+        assert self.retrieve_plan_mock.call_count == 2  # nosec
+
+    def test_warm_catalog_cache(self):
+        with open(os.path.join(DIRECTORY, "fixtures/stripe_prod_test1.json")) as fh:
+            product = convert_to_stripe_object(json.loads(fh.read()))
+        self.plan["product"] = product
+        self.list_plan_mock.return_value = plan_page([self.plan])
+
+        assert vendor.warm_catalog_cache() == 1  # nosec
+        self.list_plan_mock.assert_called_once_with(limit=100, expand=["data.product"])
+
+        plan = vendor.retrieve_stripe_plan(self.plan["id"])
+        assert plan["product"] == product["id"]  # nosec
+        with patch("stripe.Product.retrieve") as retrieve_product_mock:
+            assert vendor.retrieve_stripe_product(product["id"]) == product  # nosec
+            retrieve_product_mock.assert_not_called()
+        self.retrieve_plan_mock.assert_not_called()
+
+    def test_warm_catalog_cache_pages(self):
+        plans = [dict(self.plan, id=f"plan_{index}") for index in range(3)]
+        self.list_plan_mock.side_effect = [
+            plan_page(plans[:2], has_more=True),
+            plan_page(plans[2:]),
+        ]
+
+        assert vendor.warm_catalog_cache(limit=2) == 3  # nosec
+        assert self.list_plan_mock.call_args_list[1][1] == dict(  # nosec
+            limit=2, expand=["data.product"], starting_after="plan_1"
+        )
+        assert vendor.PLAN_CACHE.stats()["size"] == 3  # nosec
+
+    def test_warm_catalog_cache_error(self):
+        self.list_plan_mock.side_effect = InvalidRequestError("message", param="limit")
+
+        assert vendor.warm_catalog_cache() == 0  # nosec
+
+
+def plan_page(plans, has_more=False):
+    return convert_to_stripe_object(
+        dict(object="list", url="/v1/plans", data=plans, has_more=has_more)
+    )
+
 
 class TestStripeProductCalls(TestCase):
     def setUp(self) -> None:
+        vendor.clear_catalog_cache()
         with open(os.path.join(DIRECTORY, "fixtures/stripe_prod_test1.json")) as fh:
             prod = json.loads(fh.read())
         self.product = convert_to_stripe_object(prod)
@@ -448,3 +509,94 @@ class TestStripeProductCalls(TestCase):
 
         with self.assertRaises(InvalidRequestError):
             vendor.retrieve_stripe_product("prod_test1")
+
+
+class TestRunConcurrently(TestCase):
+    def test_results_in_order(self):
+        results = vendor.run_concurrently(lambda: 1, lambda: 2, lambda: 3)
+        assert results == [1, 2, 3]  # nosec
+
+    def test_calls_overlap(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def call(value):
+            barrier.wait()
+            return value
+
+        results = vendor.run_concurrently(lambda: call("a"), lambda: call("b"))
+        assert results == ["a", "b"]  # nosec
+
+    def test_error_reraised(self):
+        def fail():
+            raise InvalidRequestError("message", param="id")
+
+        with self.assertRaises(InvalidRequestError):
+            vendor.run_concurrently(lambda: 1, fail)
+
+    def test_nested_runs_serially(self):
+        def nested():
+            return vendor.run_concurrently(
+                lambda: threading.current_thread().name,
+                lambda: threading.current_thread().name,
+            )
+
+        outer, (first, second) = vendor.run_concurrently(lambda: 0, nested)
+        assert first == second  # nosec
+        assert first.startswith("stripe")  # nosec
+
+
+class TestStripeCallCounter(TestCase):
+    def setUp(self) -> None:
+        vendor.clear_catalog_cache()
+        retrieve_plan_patcher = patch("stripe.Plan.retrieve")
+        self.addCleanup(retrieve_plan_patcher.stop)
+        self.retrieve_plan_mock = retrieve_plan_patcher.start()
+
+    def test_counts_requests_and_retries(self):
+        self.retrieve_plan_mock.side_effect = [APIConnectionError("message"), {}]
+
+        with vendor.stripe_call_counter() as stripe_calls:
+            vendor.fetch_stripe_plan("plan_test1")
+
+        assert stripe_calls == {"fetch_stripe_plan": 2}  # nosec
+
+    def test_counts_concurrent_calls(self):
+        self.retrieve_plan_mock.return_value = {"id": "plan_test1"}
+
+        with vendor.stripe_call_counter() as stripe_calls:
+            vendor.run_concurrently(
+                lambda: vendor.fetch_stripe_plan("plan_test1"),
+                lambda: vendor.fetch_stripe_plan("plan_test2"),
+            )
+        vendor.fetch_stripe_plan("plan_test3")
+
+        assert stripe_calls == {"fetch_stripe_plan": 2}  # nosec
+
+    def test_object_id(self):
+        assert vendor.object_id("in_test1") == "in_test1"  # nosec
+        assert vendor.object_id({"id": "in_test1"}) == "in_test1"  # nosec
+        assert vendor.object_id(None) is None  # nosec
+
+    def test_expanded(self):
+        fetch = lambda object_id: {"id": object_id, "fetched": True}
+        assert vendor.expanded({"id": "ch_test1"}, fetch) == {"id": "ch_test1"}  # nosec
+        assert vendor.expanded("ch_test1", fetch)["fetched"]  # nosec
+
+
+class TestRateLimiter(TestCase):
+    def test_burst_then_wait(self):
+        limiter = vendor.RateLimiter(rate=100, burst=2)
+        with patch("time.sleep") as sleep:
+            assert limiter.acquire() == 0  # nosec
+            assert limiter.acquire() == 0  # nosec
+            limiter.updated_at -= 0.001
+            sleep.side_effect = lambda delay: setattr(
+                limiter, "updated_at", limiter.updated_at - delay
+            )
+            assert limiter.acquire() > 0  # nosec
+        sleep.assert_called()
+
+    def test_shared_limiter(self):
+        assert (
+            vendor.get_stripe_rate_limiter() is vendor.get_stripe_rate_limiter()
+        )  # nosec
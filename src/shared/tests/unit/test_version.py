@@ -2,15 +2,34 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
+import json
+
+from flask import Flask
+
 from hub.shared.version import get_version
 from hub.shared.cfg import CFG
 
+app = Flask(__name__)
+
 
 def test_get_version():
     """
     test get_version
     """
     expect = dict(BRANCH=CFG.BRANCH, VERSION=CFG.VERSION, REVISION=CFG.REVISION)
-    actual, rc = get_version()
-    assert rc == 200
-    assert actual == expect
+    with app.test_request_context("/hub/version"):
+        response = get_version()
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == expect
+    assert response.headers["ETag"]
+
+
+def test_get_version_not_modified():
+    """
+    test get_version answers a matching If-None-Match with 304
+    """
+    with app.test_request_context("/hub/version"):
+        etag = get_version().headers["ETag"]
+    with app.test_request_context("/hub/version", headers={"If-None-Match": etag}):
+        response = get_version()
+    assert response.status_code == 304
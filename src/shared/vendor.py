@@ -2,8 +2,15 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 import time
-
-from typing import List, Optional, Dict, Any
+import threading
+import contextvars
+
+from cachetools import TTLCache
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterator, List, Optional, Dict, Any
 from tenacity import retry, wait_exponential, stop_after_attempt
 from stripe import Customer, Subscription, Charge, Invoice, Plan, Product, api_key
 from stripe.error import (
@@ -17,17 +24,230 @@ from stripe.error import (
     AuthenticationError,
 )
 
+from shared.cfg import CFG
 from shared.log import get_logger
 
 logger = get_logger()
 
 
+class CatalogCache:
+    """
+    Bounded TTL cache for Stripe catalog objects (Plans and Products).  The
+    catalog is small and rarely changes, so entries are kept process-wide and
+    survive across warm Lambda invocations; webhooks invalidate them early.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: int) -> None:
+        self.name = name
+        self.cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, key: str, fetch: Callable[[str], Any]) -> Any:
+        """
+        Return the cached object for key, calling fetch on a miss
+        :param key:
+        :param fetch:
+        :return: cached or freshly fetched object
+        """
+        with self.lock:
+            value = self.cache.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = fetch(key)
+        self.put(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        with self.lock:
+            self.cache[key] = value
+
+    def invalidate(self, key: str) -> None:
+        with self.lock:
+            self.cache.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(size=len(self.cache), hits=self.hits, misses=self.misses)
+
+
+PLAN_CACHE = CatalogCache(
+    "plan", CFG.STRIPE_CATALOG_CACHE_MAXSIZE, CFG.STRIPE_CATALOG_CACHE_TTL
+)
+PRODUCT_CACHE = CatalogCache(
+    "product", CFG.STRIPE_CATALOG_CACHE_MAXSIZE, CFG.STRIPE_CATALOG_CACHE_TTL
+)
+
+
+STRIPE_CALLS: Counter = Counter()
+STRIPE_CALLS_LOCK = threading.Lock()
+EVENT_STRIPE_CALLS: contextvars.ContextVar = contextvars.ContextVar(
+    "EVENT_STRIPE_CALLS", default=None
+)
+
+
+def count_stripe_call(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Count every request made to the Stripe API, retries included, both
+    process-wide and against the counter of the event being handled.
+    """
+
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with STRIPE_CALLS_LOCK:
+            STRIPE_CALLS[fn.__name__] += 1
+            event_calls = EVENT_STRIPE_CALLS.get()
+            if event_calls is not None:
+                event_calls[fn.__name__] += 1
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def stripe_call_counter() -> Iterator[Counter]:
+    """
+    Collect the Stripe calls made within the block, including those issued
+    through run_concurrently
+    :return: Counter of call name to number of requests
+    """
+    calls: Counter = Counter()
+    token = EVENT_STRIPE_CALLS.set(calls)
+    try:
+        yield calls
+    finally:
+        EVENT_STRIPE_CALLS.reset(token)
+
+
+def object_id(value: Any) -> Optional[str]:
+    """
+    Id of a Stripe reference whether or not it was expanded
+    :param value: id string or expanded object
+    :return: id
+    """
+    if isinstance(value, dict):
+        return value.get("id")
+    return value
+
+
+def expanded(value: Any, fetch: Callable[[Any], Any]) -> Any:
+    """
+    Return an expanded Stripe reference as is, otherwise fetch it by id
+    :param value: id string or expanded object
+    :param fetch: retrieve function taking the id
+    :return: Stripe object
+    """
+    if isinstance(value, dict):
+        return value
+    return fetch(value)
+
+
+STRIPE_EXECUTOR = None
+STRIPE_EXECUTOR_LOCK = threading.Lock()
+STRIPE_WORKER = threading.local()
+
+
+def get_stripe_executor() -> ThreadPoolExecutor:
+    global STRIPE_EXECUTOR
+    with STRIPE_EXECUTOR_LOCK:
+        if STRIPE_EXECUTOR is None:
+            STRIPE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=CFG.STRIPE_MAX_CONCURRENCY,
+                thread_name_prefix="stripe",
+                initializer=_mark_stripe_worker,
+            )
+    return STRIPE_EXECUTOR
+
+
+def _mark_stripe_worker() -> None:
+    STRIPE_WORKER.active = True
+
+
+class RateLimiter:
+    """
+    Token bucket shared between threads: `rate` requests per second on
+    average, with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be made
+        :return: seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+STRIPE_RATE_LIMITER = None
+STRIPE_RATE_LIMITER_LOCK = threading.Lock()
+
+
+def get_stripe_rate_limiter() -> RateLimiter:
+    """
+    Process-wide budget of STRIPE_RATE_LIMIT requests per second for bulk
+    work such as event scans, leaving Stripe's account-wide limit to
+    customer-facing calls
+    """
+    global STRIPE_RATE_LIMITER
+    with STRIPE_RATE_LIMITER_LOCK:
+        if STRIPE_RATE_LIMITER is None:
+            STRIPE_RATE_LIMITER = RateLimiter(CFG.STRIPE_RATE_LIMIT)
+    return STRIPE_RATE_LIMITER
+
+
+def run_concurrently(*calls: Callable[[], Any]) -> List[Any]:
+    """
+    Run independent Stripe calls on the bounded, process-wide pool and return
+    their results in call order.  Dependent calls should be chained inside one
+    callable.  The first exception raised by a call is re-raised.  Calls made
+    from a pool thread run serially so nested fan-out cannot exhaust the pool.
+    :param calls: zero argument callables
+    :return: list of results
+    """
+    if len(calls) < 2 or getattr(STRIPE_WORKER, "active", False):
+        return [call() for call in calls]
+    executor = get_stripe_executor()
+    futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+    return [future.result() for future in futures]
+
+
 # begin Customer calls
 @retry(
     wait=wait_exponential(multiplier=1, min=1, max=8),
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def get_customer_list(email: str) -> Optional[List[Customer]]:
     try:
         customer_list = Customer.list(email=email)
@@ -48,6 +268,7 @@ def get_customer_list(email: str) -> Optional[List[Customer]]:
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def modify_customer(
     customer_id: str, source_token: str, idempotency_key: str
 ) -> Customer:
@@ -82,6 +303,7 @@ def modify_customer(
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def create_stripe_customer(
     source_token: str, email: str, userid: str, name: str, idempotency_key: str
 ) -> Customer:
@@ -123,6 +345,7 @@ def create_stripe_customer(
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def delete_stripe_customer(customer_id: str) -> Dict[str, Any]:
     """
     Delete a Stripe customer
@@ -149,6 +372,7 @@ def delete_stripe_customer(customer_id: str) -> Dict[str, Any]:
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def retrieve_stripe_customer(customer_id: str) -> Optional[Customer]:
     """
     Retrieve Stripe Customer
@@ -179,16 +403,18 @@ def retrieve_stripe_customer(customer_id: str) -> Optional[Customer]:
     stop=stop_after_attempt(4),
     reraise=True,
 )
-def retrieve_stripe_subscription(subscription_id: str) -> Subscription:
+@count_stripe_call
+def retrieve_stripe_subscription(
+    subscription_id: str, expand: Optional[List[str]] = None
+) -> Subscription:
     """
-    Create a new Stripe subscription for a given customer
-    :param customer_id:
-    :param plan_id:
-    :param idempotency_key:
+    Retrieve a Stripe subscription, expanding its customer by default
+    :param subscription_id:
+    :param expand: Stripe expand paths, e.g. ["customer", "latest_invoice.charge"]
     :return: Subscription object
     """
     try:
-        sub = Subscription.retrieve(id=subscription_id, expand=["customer"])
+        sub = Subscription.retrieve(id=subscription_id, expand=expand or ["customer"])
         logger.debug("retrieve stripe subscription", sub=sub)
         return sub
     except (
@@ -209,6 +435,7 @@ def retrieve_stripe_subscription(subscription_id: str) -> Subscription:
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def build_stripe_subscription(
     customer_id: str, plan_id: str, idempotency_key: str
 ) -> Subscription:
@@ -245,6 +472,7 @@ def build_stripe_subscription(
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def update_stripe_subscription(
     subscription: Dict[str, Any], plan_id: str, idempotency_key: str
 ) -> Subscription:
@@ -287,6 +515,7 @@ def update_stripe_subscription(
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def cancel_stripe_subscription_period_end(
     subscription_id: str, idempotency_key: str
 ) -> Subscription:
@@ -321,6 +550,7 @@ def cancel_stripe_subscription_period_end(
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def cancel_stripe_subscription_immediately(
     subscription_id: str, idempotency_key: str
 ) -> Subscription:
@@ -351,6 +581,7 @@ def cancel_stripe_subscription_immediately(
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def reactivate_stripe_subscription(
     subscription_id: str, idempotency_key: str
 ) -> Subscription:
@@ -385,6 +616,7 @@ def reactivate_stripe_subscription(
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def list_customer_subscriptions(cust_id: str) -> List[Subscription]:
     """
     List customer subscriptions
@@ -416,6 +648,7 @@ def list_customer_subscriptions(cust_id: str) -> List[Subscription]:
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def retrieve_stripe_charge(charge_id: str) -> Charge:
     """
     Retrive Stripe Charge
@@ -453,14 +686,21 @@ def retrieve_stripe_charge(charge_id: str) -> Charge:
     stop=stop_after_attempt(4),
     reraise=True,
 )
-def retrieve_stripe_invoice(invoice_id: str) -> Invoice:
+@count_stripe_call
+def retrieve_stripe_invoice(
+    invoice_id: str, expand: Optional[List[str]] = None
+) -> Invoice:
     """
     Retrieve Stripe Invoice
     :param invoice_id:
+    :param expand: optional Stripe expand paths, e.g. ["charge"]
     :return: Invoice
     """
     try:
-        invoice = Invoice.retrieve(invoice_id)
+        if expand:
+            invoice = Invoice.retrieve(invoice_id, expand=expand)
+        else:
+            invoice = Invoice.retrieve(invoice_id)
         logger.debug("retrieve stripe invoice", invoice=invoice)
         return invoice
     except (
@@ -480,6 +720,7 @@ def retrieve_stripe_invoice(invoice_id: str) -> Invoice:
     stop=stop_after_attempt(4),
     reraise=True,
 )
+@count_stripe_call
 def retrieve_stripe_invoice_upcoming_by_subscription(
     customer_id: str, subscription_id: str
 ) -> Invoice:
@@ -505,6 +746,7 @@ def retrieve_stripe_invoice_upcoming_by_subscription(
         raise e
 
 
+@count_stripe_call
 def retrieve_stripe_invoice_upcoming(customer: str) -> Invoice:
     """
     Retrieve an upcoming stripe invoice
@@ -535,14 +777,24 @@ def retrieve_stripe_invoice_upcoming(customer: str) -> Invoice:
     stop=stop_after_attempt(4),
     reraise=True,
 )
-def retrieve_plan_list(limit: int) -> List[Plan]:
+@count_stripe_call
+def retrieve_plan_list(
+    limit: int, expand: Optional[List[str]] = None, starting_after: Optional[str] = None
+) -> List[Plan]:
     """
     Retrieve Stripe Plan list
     :param limit:
+    :param expand: optional Stripe expand paths, e.g. ["data.product"]
+    :param starting_after: optional id of the plan the page starts after
     :return: List of Plans
     """
     try:
-        plans = Plan.list(limit=limit)
+        params: Dict[str, Any] = dict(limit=limit)
+        if expand:
+            params["expand"] = expand
+        if starting_after:
+            params["starting_after"] = starting_after
+        plans = Plan.list(**params)
         return plans
     except (
         InvalidRequestError,
@@ -561,9 +813,10 @@ def retrieve_plan_list(limit: int) -> List[Plan]:
     stop=stop_after_attempt(4),
     reraise=True,
 )
-def retrieve_stripe_plan(plan_id: str) -> Plan:
+@count_stripe_call
+def fetch_stripe_plan(plan_id: str) -> Plan:
     """
-    Retrieve Stripe Plan
+    Retrieve Stripe Plan, bypassing the catalog cache
     :param plan_id:
     :return:
     """
@@ -583,6 +836,15 @@ def retrieve_stripe_plan(plan_id: str) -> Plan:
         raise e
 
 
+def retrieve_stripe_plan(plan_id: str) -> Plan:
+    """
+    Retrieve Stripe Plan through the process-wide catalog cache
+    :param plan_id:
+    :return:
+    """
+    return PLAN_CACHE.get_or_fetch(plan_id, fetch_stripe_plan)
+
+
 # end Plan calls
 
 
@@ -592,9 +854,10 @@ def retrieve_stripe_plan(plan_id: str) -> Plan:
     stop=stop_after_attempt(4),
     reraise=True,
 )
-def retrieve_stripe_product(product_id: str) -> Product:
+@count_stripe_call
+def fetch_stripe_product(product_id: str) -> Product:
     """
-    Retrieve Stripe Product
+    Retrieve Stripe Product, bypassing the catalog cache
     :param product_id:
     :return: Product
     """
@@ -614,4 +877,67 @@ def retrieve_stripe_product(product_id: str) -> Product:
         raise e
 
 
+def retrieve_stripe_product(product_id: str) -> Product:
+    """
+    Retrieve Stripe Product through the process-wide catalog cache
+    :param product_id:
+    :return: Product
+    """
+    return PRODUCT_CACHE.get_or_fetch(product_id, fetch_stripe_product)
+
+
 # end Product calls
+
+
+# start catalog cache calls
+def warm_catalog_cache(limit: int = 100) -> int:
+    """
+    Load every plan, with its product expanded, into the catalog cache with
+    one list call per page of limit plans.  Failures are logged and leave the
+    rest of the cache to fill lazily.
+    :param limit: plans per page
+    :return: number of plans cached
+    """
+    count = 0
+    starting_after = None
+    has_more = True
+    while has_more:
+        try:
+            plans = retrieve_plan_list(
+                limit, expand=["data.product"], starting_after=starting_after
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("warm catalog cache error", error=str(e))
+            break
+        for plan in plans:
+            product = plan.get("product")
+            if isinstance(product, dict):
+                PRODUCT_CACHE.put(product["id"], product)
+                plan["product"] = product["id"]
+            PLAN_CACHE.put(plan["id"], plan)
+            count += 1
+        has_more = plans.get("has_more", False) and bool(plans.get("data"))
+        if has_more:
+            starting_after = plans["data"][-1]["id"]
+    logger.info("catalog cache warmed", plans=count, stats=catalog_cache_stats())
+    return count
+
+
+def invalidate_stripe_plan(plan_id: str) -> None:
+    PLAN_CACHE.invalidate(plan_id)
+
+
+def invalidate_stripe_product(product_id: str) -> None:
+    PRODUCT_CACHE.invalidate(product_id)
+
+
+def clear_catalog_cache() -> None:
+    PLAN_CACHE.clear()
+    PRODUCT_CACHE.clear()
+
+
+def catalog_cache_stats() -> Dict[str, Dict[str, int]]:
+    return dict(plan=PLAN_CACHE.stats(), product=PRODUCT_CACHE.stats())
+
+
+# end catalog cache calls
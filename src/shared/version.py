@@ -2,14 +2,24 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-from shared.types import FlaskResponse
-from shared.cfg import CFG
+from flask import Response
+
+from shared.build import get_build_info
+from shared.precomputed import JsonDocument
 from shared.log import get_logger
 
 logger = get_logger()
 
+VERSION_DOCUMENT = None
+
 
-def get_version() -> FlaskResponse:
-    version = dict(BRANCH=CFG.BRANCH, VERSION=CFG.VERSION, REVISION=CFG.REVISION)
-    logger.debug("version", version=version)
-    return version, 200
+def get_version() -> Response:
+    global VERSION_DOCUMENT
+    if VERSION_DOCUMENT is None:
+        build_info = get_build_info()
+        version = {
+            field: build_info[field] for field in ("BRANCH", "VERSION", "REVISION")
+        }
+        logger.debug("version", version=version)
+        VERSION_DOCUMENT = JsonDocument(version)
+    return VERSION_DOCUMENT.response()